@@ -1,10 +1,18 @@
-from typing import Any
+from typing import Any, Callable, Iterator, NamedTuple, Optional
 import abc
+import argparse
+import contextlib
+import gc
+import io
+import json
+import multiprocessing
 import os
 import sys
 import subprocess
 import importlib
+import time
 import traceback
+import tracemalloc
 import pylint.lint
 from mypy import api
 
@@ -16,12 +24,41 @@ class Benchmark:
     COLOR_ENDC = '\033[0m'
     COLOR_RESULT = '\033[93m'
 
-    def __init__(self, argv) -> None:
+    # tests running external tools: not part of the performance mode, started first with --jobs
+    LIST_TOOL_TESTS = ['test_pylint', 'test_mypy', 'test_pytest']
+
+    def __init__(self, argv: list[str]) -> None:
+        self.argv = argv
         self.mode = argv[1]
         if self.mode == 'python':
             self.script = argv[2]
             self.game_server = Python_Game_Server(self.script)
 
+        # performance mode, e.g. "benchmark/benchmark_dog.py python dog.Dog --perf --perf-tolerance 0.5"
+        parser = argparse.ArgumentParser(prog=os.path.basename(argv[0]))
+        parser.add_argument('--perf', action='store_true',
+                            help='measure wall time and peak memory per test and compare with a baseline')
+        parser.add_argument('--perf-baseline',
+                            help='baseline file (default: benchmark/perf_baseline_<module>.json)')
+        parser.add_argument('--perf-tolerance', type=float, default=1.0,
+                            help='allowed relative increase of time and peak memory (1.0 = +100%%)')
+        parser.add_argument('--perf-min-seconds', type=float, default=0.005,
+                            help='time increases below this many seconds are ignored as noise')
+        parser.add_argument('--perf-repeat', type=int, default=5,
+                            help='runs per test, the fastest run is compared')
+        parser.add_argument('--perf-update', action='store_true',
+                            help='overwrite the baseline with the results of this run')
+        parser.add_argument('--jobs', '-j', type=int, default=1,
+                            help='number of worker processes running the tests (0 = number of CPUs)')
+        args, _ = parser.parse_known_args(argv[3:])
+        self.jobs = args.jobs if args.jobs > 0 else multiprocessing.cpu_count()
+        self.perf = args.perf or args.perf_update
+        self.perf_baseline: Optional[str] = args.perf_baseline
+        self.perf_tolerance = args.perf_tolerance
+        self.perf_min_seconds = args.perf_min_seconds
+        self.perf_repeat = max(1, args.perf_repeat)
+        self.perf_update = args.perf_update
+
     def run_tests(self, disable_features=False) -> None:
         os.system('color')
 
@@ -33,39 +70,173 @@ class Benchmark:
 
         list_function_name = self.get_list_function_name()
 
+        dict_perf_baseline = self.load_perf_baseline() if self.perf else {}
+        dict_perf: dict[str, dict[str, float]] = {}
+        cnt_perf_regressions = 0
+
+        if self.jobs > 1 and self.perf:
+            print(f'Performance mode runs the tests sequentially (ignoring --jobs {self.jobs})')
+            print()
+
         cnt_tests_valid = 0
         cnt_tests_total = 0
         cnt_points_valid = 0
         cnt_points_total = 0
-        for function_name in list_function_name:
+        for result in self.iter_test_results(list_function_name, disable_features, dict_perf_baseline):
 
-            function = getattr(self, function_name)
-            id_test = function.__doc__.split(":")[0]
+            function = getattr(self, result.function_name)
             points = int(function.__doc__.split(" ")[-2][1:])
-            description = function.__doc__[len(id_test) + 2:]
             cnt_tests_total += 1
             cnt_points_total += points
-            try:
-                if disable_features:
-                    os.environ["DISABLED_FEATURES"] = function_name
-                function()
-            except AssertionError as e:
-                print(f'{self.COLOR_FAIL}{id_test}{self.COLOR_ENDC}: {description}')
-                print(e)
-            except Exception:
-                print(f'{self.COLOR_FAIL}{id_test}{self.COLOR_ENDC}: {description}')
-                print(traceback.format_exc())
-            else:
-                print(f'{self.COLOR_OKAY}{id_test}{self.COLOR_ENDC}: {description}')
+            if result.is_valid:
                 cnt_tests_valid += 1
                 cnt_points_valid += points
-            print()
+            if result.perf is not None:
+                dict_perf[result.function_name] = result.perf
+            if result.is_perf_regression:
+                cnt_perf_regressions += 1
 
         print(f'{self.COLOR_RESULT}Result{self.COLOR_ENDC}')
         print(f'Tests: {cnt_tests_valid}/{cnt_tests_total} valid', )
         print(f'Mark:  {cnt_points_valid}/{cnt_points_total} points', )
         print()
 
+        if self.perf:
+            self.print_perf(dict_perf, dict_perf_baseline, cnt_perf_regressions)
+            if self.perf_update or not dict_perf_baseline:
+                self.save_perf_baseline(dict_perf)
+            if cnt_perf_regressions > 0:
+                sys.exit(1)
+
+
+    def iter_test_results(self, list_function_name: list[str], disable_features: bool,
+                          dict_perf_baseline: dict[str, dict[str, float]]) -> Iterator['Test_Result']:
+        """ Run the tests (in a process pool with --jobs) and yield their results in the given order """
+        if self.jobs <= 1 or self.perf or len(list_function_name) <= 1:
+            for function_name in list_function_name:
+                yield self.run_test(function_name, disable_features, dict_perf_baseline)
+            return
+
+        # each worker creates its own benchmark (and game server), tests running external tools start first
+        list_submit = sorted(list_function_name, key=lambda function_name: function_name not in self.LIST_TOOL_TESTS)
+        with multiprocessing.Pool(self.jobs, initializer=_init_worker, initargs=(type(self), self.argv)) as pool:
+            dict_async = {
+                function_name: pool.apply_async(_run_test_in_worker, (function_name, disable_features))
+                for function_name in list_submit
+            }
+            for function_name in list_function_name:
+                result, output = dict_async[function_name].get()
+                print(output, end='')
+                yield result
+
+
+    def run_test(self, function_name: str, disable_features: bool = False,
+                 dict_perf_baseline: Optional[dict[str, dict[str, float]]] = None) -> 'Test_Result':
+        """ Run a single test and print its result """
+        function = getattr(self, function_name)
+        id_test = function.__doc__.split(":")[0]
+        description = function.__doc__[len(id_test) + 2:]
+        perf = None
+        is_perf_regression = False
+        is_valid = False
+        try:
+            if disable_features:
+                os.environ["DISABLED_FEATURES"] = function_name
+            if self.perf and function_name not in self.LIST_TOOL_TESTS:
+                perf = self.run_test_perf(function)
+                regression = self.check_perf_regression(perf, (dict_perf_baseline or {}).get(function_name))
+                if regression is not None:
+                    is_perf_regression = True
+                    raise AssertionError(f'Performance regression: {regression}')
+            else:
+                function()
+        except AssertionError as e:
+            print(f'{self.COLOR_FAIL}{id_test}{self.COLOR_ENDC}: {description}')
+            print(e)
+        except Exception:
+            print(f'{self.COLOR_FAIL}{id_test}{self.COLOR_ENDC}: {description}')
+            print(traceback.format_exc())
+        else:
+            print(f'{self.COLOR_OKAY}{id_test}{self.COLOR_ENDC}: {description}')
+            is_valid = True
+        print()
+        return Test_Result(function_name, is_valid, perf, is_perf_regression)
+
+
+    def get_perf_baseline_path(self) -> str:
+        if self.perf_baseline:
+            return self.perf_baseline
+        module_name, _ = self.script.split('.')
+        return os.path.join('benchmark', f'perf_baseline_{module_name}.json')
+
+
+    def load_perf_baseline(self) -> dict[str, dict[str, float]]:
+        path = self.get_perf_baseline_path()
+        if self.perf_update or not os.path.isfile(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as file:
+            dict_perf: dict[str, dict[str, float]] = json.load(file)['tests']
+        return dict_perf
+
+
+    def save_perf_baseline(self, dict_perf: dict[str, dict[str, float]]) -> None:
+        path = self.get_perf_baseline_path()
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'script': self.script, 'tests': dict_perf}, file, indent=2, sort_keys=True)
+        print(f'Performance baseline written to {path}')
+        print()
+
+
+    def run_test_perf(self, function: Callable[[], Any]) -> dict[str, float]:
+        """ Run a test perf_repeat times, return its fastest wall time and its peak memory """
+        list_seconds = []
+        for _ in range(self.perf_repeat):
+            # like timeit, the garbage collector does not run while timing (it would hit random tests)
+            gc.collect()
+            gc.disable()
+            try:
+                time_start = time.perf_counter()
+                function()
+                list_seconds.append(time.perf_counter() - time_start)
+            finally:
+                gc.enable()
+        # the peak memory is measured in an extra run, as tracemalloc slows down the test
+        tracemalloc.start()
+        try:
+            function()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {'seconds': min(list_seconds), 'peak_bytes': peak_bytes}
+
+
+    def check_perf_regression(self, perf: dict[str, float], perf_baseline: Optional[dict[str, float]]) -> Optional[str]:
+        """ Return a description of the regression, if the test got slower or needs more memory than allowed """
+        if perf_baseline is None:
+            return None
+        factor = 1.0 + self.perf_tolerance
+        seconds, seconds_baseline = perf['seconds'], perf_baseline['seconds']
+        if seconds > seconds_baseline * factor and seconds - seconds_baseline > self.perf_min_seconds:
+            return f'wall time {seconds * 1000:.1f} ms, baseline {seconds_baseline * 1000:.1f} ms'
+        peak_bytes, peak_bytes_baseline = perf['peak_bytes'], perf_baseline['peak_bytes']
+        if peak_bytes > peak_bytes_baseline * factor and peak_bytes - peak_bytes_baseline > 64 * 1024:
+            return f'peak memory {peak_bytes / 1024:.0f} KiB, baseline {peak_bytes_baseline / 1024:.0f} KiB'
+        return None
+
+
+    def print_perf(self, dict_perf: dict[str, dict[str, float]], dict_perf_baseline: dict[str, dict[str, float]],
+                   cnt_perf_regressions: int) -> None:
+        print(f'{self.COLOR_RESULT}Performance{self.COLOR_ENDC}')
+        for function_name, perf in dict_perf.items():
+            line = f'{function_name:<50} {perf["seconds"] * 1000:>9.2f} ms {perf["peak_bytes"] / 1024:>9.0f} KiB'
+            perf_baseline = dict_perf_baseline.get(function_name)
+            if perf_baseline is not None and perf_baseline['seconds'] > 0:
+                line += f'  ({perf["seconds"] / perf_baseline["seconds"]:.2f}x time)'
+            print(line)
+        print(f'Total: {sum(perf["seconds"] for perf in dict_perf.values()) * 1000:.1f} ms, '
+              f'regressions: {cnt_perf_regressions} (tolerance {self.perf_tolerance:.0%})')
+        print()
+
 
     def get_list_function_name(self) -> list[str]:
         list_function_name = []
@@ -125,6 +296,30 @@ class Benchmark:
             raise AssertionError(f"Test coverage is too low ({int(coverage_result.stdout)}%)")
 
 
+class Test_Result(NamedTuple):
+    function_name: str
+    is_valid: bool
+    perf: Optional[dict[str, float]]
+    is_perf_regression: bool
+
+
+# benchmark of a worker process (--jobs), created once per worker by _init_worker
+_worker_benchmark: Optional[Benchmark] = None
+
+
+def _init_worker(benchmark_class: type, argv: list[str]) -> None:
+    global _worker_benchmark  # pylint: disable=global-statement
+    _worker_benchmark = benchmark_class(argv)
+
+
+def _run_test_in_worker(function_name: str, disable_features: bool) -> tuple[Test_Result, str]:
+    """ Run a test in a worker process, return its result and everything it printed """
+    assert _worker_benchmark is not None
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        result = _worker_benchmark.run_test(function_name, disable_features)
+    return result, output.getvalue()
+
+
 class Game_Server(metaclass=abc.ABCMeta):
 
     @abc.abstractmethod
@@ -0,0 +1,388 @@
+"""Micro-benchmarks of the game engines.
+
+Usage: python benchmark/benchmark_perf.py --json perf.json [--compare perf_old.json] [--games dog,battleship]
+
+For every game module the engine operations get_list_action, apply_action,
+get_player_view and set_state are timed over representative states (sampled
+from seeded random games), and full games are played out. The report contains
+ops/sec, p50/p99 latency and the peak memory allocated per call (tracemalloc).
+With --json the results are written to a file that can be compared against the
+results of another commit with --compare.
+"""
+
+import abc
+import argparse
+import contextlib
+import copy
+import functools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence, cast
+
+import server.py.battleship as battleship
+import server.py.dog as dog
+import server.py.hangman as hangman
+import server.py.uno as uno
+
+
+LIST_OPERATION = ['get_list_action', 'apply_action', 'get_player_view', 'set_state', 'playout']
+
+
+class Perf_Game(metaclass=abc.ABCMeta):
+    """Uniform access to one game module for the micro-benchmarks."""
+
+    MAX_MOVES = 2000
+
+    @abc.abstractmethod
+    def new_game(self, seed: int) -> Any:
+        """Create a game ready to be played"""
+
+    @abc.abstractmethod
+    def new_player(self, seed: int) -> Any:
+        """Create a random player"""
+
+    @abc.abstractmethod
+    def is_finished(self, state: Any) -> bool:
+        """Check if the game is over"""
+
+    def get_state(self, game: Any) -> Any:
+        state = game.get_state()
+        if state is None:
+            raise NotImplementedError('get_state returned no state')
+        return state
+
+    def select_action(self, player: Any, game: Any, list_action: List[Any]) -> Any:
+        return player.select_action(game.get_state(), list_action) if list_action else None
+
+    def get_player_view(self, game: Any) -> Any:
+        return game.get_player_view(game.get_state().idx_player_active)
+
+    def clone_state(self, state: Any) -> Any:
+        return state.clone() if hasattr(state, 'clone') else copy.deepcopy(state)
+
+    def play_move(self, game: Any, player: Any) -> bool:
+        """Play one move, return False if the game can not continue"""
+        if self.is_finished(self.get_state(game)):
+            return False
+        list_action = game.get_list_action()
+        if list_action is None:
+            raise NotImplementedError('get_list_action returned no list')
+        action = self.select_action(player, game, list_action)
+        if action is None:
+            return False
+        game.apply_action(action)
+        return True
+
+
+class Perf_Dog(Perf_Game):
+
+    def new_game(self, seed: int) -> Any:
+        return dog.Dog(seed=seed)
+
+    def new_player(self, seed: int) -> Any:
+        return dog.RandomPlayer(seed=seed)
+
+    def is_finished(self, state: Any) -> bool:
+        return bool(state.phase == dog.GamePhase.FINISHED)
+
+    def play_move(self, game: Any, player: Any) -> bool:
+        if self.is_finished(game.get_state()):
+            return False
+        # without any possible action the player folds its cards (apply_action(None))
+        game.apply_action(self.select_action(player, game, game.get_list_action()))
+        return True
+
+
+class Perf_Battleship(Perf_Game):
+
+    def new_game(self, seed: int) -> Any:
+        # the engine leaves ship placement to the players: place both fleets and start shooting
+        game = battleship.Battleship(seed=seed)
+        for player in game.get_state().players:
+            game.place_ships_randomly(player.ships)
+        game.get_state().phase = battleship.GamePhase.RUNNING
+        return game
+
+    def new_player(self, seed: int) -> Any:
+        return battleship.RandomPlayer(seed=seed)
+
+    def is_finished(self, state: Any) -> bool:
+        return bool(state.phase == battleship.GamePhase.FINISHED)
+
+
+class Perf_Hangman(Perf_Game):
+
+    LIST_WORD = ['devops', 'benchmark', 'python', 'container', 'pipeline', 'kubernetes', 'latency', 'throughput']
+
+    def new_game(self, seed: int) -> Any:
+        game = hangman.Hangman()
+        word = random.Random(seed).choice(self.LIST_WORD)
+        game.set_state(hangman.HangmanGameState(word_to_guess=word, guesses=[], phase=hangman.GamePhase.RUNNING))
+        return game
+
+    def new_player(self, seed: int) -> Any:
+        return hangman.RandomPlayer(seed=seed)
+
+    def is_finished(self, state: Any) -> bool:
+        return bool(state.phase == hangman.GamePhase.FINISHED)
+
+    def select_action(self, player: Any, game: Any, list_action: List[Any]) -> Any:
+        return player.make_guess(list_action) if list_action else None
+
+    def get_player_view(self, game: Any) -> Any:
+        raise NotImplementedError('Hangman has no player view')
+
+
+class Perf_Uno(Perf_Game):
+
+    def new_game(self, seed: int) -> Any:
+        game = uno.Uno()
+        game.set_state(uno.GameState(
+            list_card_draw=None, list_card_discard=None, list_player=[], phase=uno.GamePhase.SETUP,
+            cnt_player=3, idx_player_active=None, direction=1, color='', cnt_to_draw=0, has_drawn=False))
+        return game
+
+    def new_player(self, seed: int) -> Any:
+        return uno.RandomPlayer(seed=seed)
+
+    def is_finished(self, state: Any) -> bool:
+        return bool(state.phase == uno.GamePhase.FINISHED)
+
+
+DICT_PERF_GAME: Dict[str, Perf_Game] = {
+    'dog': Perf_Dog(),
+    'battleship': Perf_Battleship(),
+    'hangman': Perf_Hangman(),
+    'uno': Perf_Uno(),
+}
+
+
+def sample_states(perf_game: Perf_Game, cnt_states: int, seed: int) -> List[Any]:
+    """Collect cnt_states (not finished) states by playing seeded random games"""
+    list_state: List[Any] = []
+    seed_game = seed
+    while len(list_state) < cnt_states:
+        game = perf_game.new_game(seed_game)
+        player = perf_game.new_player(seed_game)
+        for _ in range(perf_game.MAX_MOVES):
+            state = perf_game.get_state(game)
+            if perf_game.is_finished(state) or len(list_state) >= cnt_states:
+                break
+            list_state.append(perf_game.clone_state(state))
+            if not perf_game.play_move(game, player):
+                break
+        seed_game += 1
+        if seed_game - seed > 10 * cnt_states:
+            raise RuntimeError('could not sample enough states')
+    return list_state
+
+
+def percentile(list_value: Sequence[float], q: float) -> float:
+    list_sorted = sorted(list_value)
+    return list_sorted[min(len(list_sorted) - 1, int(round(q * (len(list_sorted) - 1))))]
+
+
+def summarize(list_ns: List[int], list_alloc: List[int]) -> Dict[str, Any]:
+    """Aggregate the call durations (ns) and the peak allocations (bytes) of one operation"""
+    total_s = sum(list_ns) / 1e9
+    return {
+        'cnt_calls': len(list_ns),
+        'ops_per_sec': len(list_ns) / total_s if total_s > 0 else 0.0,
+        'mean_us': sum(list_ns) / len(list_ns) / 1e3,
+        'p50_us': percentile(list_ns, 0.50) / 1e3,
+        'p99_us': percentile(list_ns, 0.99) / 1e3,
+        'alloc_mean_bytes': sum(list_alloc) / len(list_alloc) if list_alloc else 0.0,
+        'alloc_max_bytes': max(list_alloc) if list_alloc else 0,
+    }
+
+
+def measure(list_call: List[Callable[[], Any]], cnt_rounds: int) -> Dict[str, Any]:
+    """Time every prepared call cnt_rounds times, then measure its allocations once under tracemalloc.
+
+    A prepared call is a function returning the function to time (the preparation itself is not measured).
+    """
+    list_ns = []
+    for _ in range(cnt_rounds):
+        for prepare in list_call:
+            function = prepare()
+            time_start = time.perf_counter_ns()
+            function()
+            list_ns.append(time.perf_counter_ns() - time_start)
+
+    list_alloc = []
+    tracemalloc.start()
+    try:
+        for prepare in list_call:
+            function = prepare()
+            size_before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            function()
+            _, size_peak = tracemalloc.get_traced_memory()
+            list_alloc.append(max(0, size_peak - size_before))
+    finally:
+        tracemalloc.stop()
+    return summarize(list_ns, list_alloc)
+
+
+def benchmark_game(perf_game: Perf_Game, cnt_states: int, cnt_rounds: int, cnt_playouts: int,
+                   seed: int) -> Dict[str, Any]:
+    """Run all micro-benchmarks of one game, failing operations are reported with their error"""
+    dict_result: Dict[str, Any] = {}
+    try:
+        list_state = sample_states(perf_game, cnt_states, seed)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return {operation: {'error': f'{type(e).__name__}: {e}'} for operation in LIST_OPERATION}
+
+    game = perf_game.new_game(seed)
+    rng = random.Random(seed)
+
+    def prepare_get_list_action(state: Any) -> Callable[[], Any]:
+        game.set_state(perf_game.clone_state(state))
+        return cast(Callable[[], Any], game.get_list_action)
+
+    def prepare_apply_action(state: Any) -> Callable[[], Any]:
+        game.set_state(perf_game.clone_state(state))
+        list_action = game.get_list_action()
+        action = rng.choice(list_action) if list_action else None
+        return lambda: game.apply_action(action)
+
+    def prepare_get_player_view(state: Any) -> Callable[[], Any]:
+        game.set_state(perf_game.clone_state(state))
+        return lambda: perf_game.get_player_view(game)
+
+    def prepare_set_state(state: Any) -> Callable[[], Any]:
+        state_clone = perf_game.clone_state(state)
+        return lambda: game.set_state(state_clone)
+
+    dict_playout = {'cnt_moves': 0, 'cnt_errors': 0}
+
+    def prepare_playout(seed_game: int) -> Callable[[], Any]:
+        game_playout = perf_game.new_game(seed_game)
+        player_playout = perf_game.new_player(seed_game)
+
+        def playout() -> None:
+            # an engine error ends the game, it is counted instead of aborting the benchmark
+            try:
+                for _ in range(perf_game.MAX_MOVES):
+                    if not perf_game.play_move(game_playout, player_playout):
+                        break
+                    dict_playout['cnt_moves'] += 1
+            except Exception:  # pylint: disable=broad-exception-caught
+                dict_playout['cnt_errors'] += 1
+        return playout
+
+    dict_prepare: Dict[str, Callable[[Any], Callable[[], Any]]] = {
+        'get_list_action': prepare_get_list_action,
+        'apply_action': prepare_apply_action,
+        'get_player_view': prepare_get_player_view,
+        'set_state': prepare_set_state,
+    }
+    for operation, prepare in dict_prepare.items():
+        list_call: List[Callable[[], Any]] = [functools.partial(prepare, state) for state in list_state]
+        try:
+            dict_result[operation] = measure(list_call, cnt_rounds)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            dict_result[operation] = {'error': f'{type(e).__name__}: {e}'}
+
+    list_call = [functools.partial(prepare_playout, seed_game) for seed_game in range(seed, seed + cnt_playouts)]
+    try:
+        dict_result['playout'] = measure(list_call, 1)
+        # the moves are counted in the timed and in the tracemalloc pass
+        dict_result['playout']['moves_per_game'] = dict_playout['cnt_moves'] / max(1, 2 * cnt_playouts)
+        dict_result['playout']['cnt_errors'] = dict_playout['cnt_errors'] // 2
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        dict_result['playout'] = {'error': f'{type(e).__name__}: {e}'}
+
+    return dict_result
+
+
+def get_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(list_game: List[str], cnt_states: int, cnt_rounds: int, cnt_playouts: int, seed: int) -> Dict[str, Any]:
+    return {
+        'meta': {
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'states': cnt_states,
+            'rounds': cnt_rounds,
+            'playouts': cnt_playouts,
+            'seed': seed,
+        },
+        'results': {
+            name: benchmark_game_quiet(DICT_PERF_GAME[name], cnt_states, cnt_rounds, cnt_playouts, seed)
+            for name in list_game
+        },
+    }
+
+
+def benchmark_game_quiet(perf_game: Perf_Game, cnt_states: int, cnt_rounds: int, cnt_playouts: int,
+                         seed: int) -> Dict[str, Any]:
+    """benchmark_game() without the output of the engines (e.g. Battleship prints every miss)."""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        return benchmark_game(perf_game, cnt_states, cnt_rounds, cnt_playouts, seed)
+
+
+def print_report(report: Dict[str, Any], report_old: Optional[Dict[str, Any]] = None) -> None:
+    print('--- Performance Benchmark ---')
+    print(f"Commit: {report['meta']['commit']}  Python: {report['meta']['python']}")
+    for name, dict_result in report['results'].items():
+        print()
+        print(name)
+        for operation, result in dict_result.items():
+            if 'error' in result:
+                print(f'  {operation:<16} {result["error"]}')
+                continue
+            line = (f'  {operation:<16} {result["ops_per_sec"]:>12.1f} ops/sec'
+                    f'  p50 {result["p50_us"]:>10.1f} us  p99 {result["p99_us"]:>10.1f} us'
+                    f'  alloc {result["alloc_mean_bytes"] / 1024:>9.1f} KiB')
+            if 'moves_per_game' in result:
+                line += f'  ({result["moves_per_game"]:.0f} moves/game, {result["cnt_errors"]} errors)'
+            result_old = (report_old or {}).get('results', {}).get(name, {}).get(operation, {})
+            if result_old.get('ops_per_sec'):
+                line += f'  ({result["ops_per_sec"] / result_old["ops_per_sec"]:.2f}x)'
+            print(line)
+
+
+def main(argv: List[str]) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the game engines.')
+    parser.add_argument('--games', default=','.join(DICT_PERF_GAME), help='comma separated list of games')
+    parser.add_argument('--states', type=int, default=50, help='number of sampled states per game')
+    parser.add_argument('--rounds', type=int, default=5, help='timed calls per state and operation')
+    parser.add_argument('--playouts', type=int, default=5, help='number of full games per game')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the sampled games')
+    parser.add_argument('--json', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare ops/sec with')
+    args = parser.parse_args(argv)
+
+    list_game = [name for name in args.games.split(',') if name]
+    for name in list_game:
+        if name not in DICT_PERF_GAME:
+            parser.error(f"unknown game '{name}' (choose from {', '.join(DICT_PERF_GAME)})")
+
+    report = run(list_game, args.states, args.rounds, args.playouts, args.seed)
+    report_old = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            report_old = json.load(file)
+    print_report(report, report_old)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+
+    main(sys.argv[1:])
@@ -3,6 +3,8 @@ function Singleplayer(config) {
     this.game = new Game(config.game_config);
     this.game.send_action_callback = this.send_action.bind(this);
     this.ws = null;
+    this.resync_requested = false;
+    this.stream = new StateStream();
     this.main();
 };
 Singleplayer.prototype.main = function(){
@@ -25,7 +27,15 @@ Singleplayer.prototype.ws_onmessage = function(event) {
     this.add_log('> '+data.type);
     switch(data['type']) {
         case 'update':
-    		this.game.set_player_state(data['state']);
+        case 'snapshot':
+        case 'delta':
+            var state = this.stream.apply_message(data);
+            if(state==null) {
+                this.request_resync();
+                break;
+            }
+            this.resync_requested = false;
+    		this.game.set_player_state(state);
     		//console.log(data['state']);
     		/*if(data['state']['idx_player_active']==data['state']['idx_player_you'] && data['state']['list_action'].length==0) {
     			this.send_action(null);
@@ -34,6 +44,13 @@ Singleplayer.prototype.ws_onmessage = function(event) {
             break;
     }
 };
+Singleplayer.prototype.request_resync = function() {
+    // a delta was missed, ask the server for a new snapshot (once)
+    if(!this.resync_requested) {
+        this.resync_requested = true;
+        this.ws_send({'type': 'resync'});
+    }
+};
 Singleplayer.prototype.add_log = function(msg) {
     //console.log(msg);
 };
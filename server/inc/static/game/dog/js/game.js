@@ -285,6 +285,18 @@ Game.prototype.set_player_state = function(player_state) {
 	this.list_ball_selectable_from = [];
 	this.list_ball_selectable_to = [];
 	this.player_state = player_state;
+	if(this.player_state.idx_player_you!=null) {
+		this.idx_player_you = this.player_state.idx_player_you;
+	}
+	// masked hands of the other players are sent as a number of cards, show their backs
+	for(var p=0; p<this.player_state.list_player.length; p++) {
+		var player = this.player_state.list_player[p];
+		if(player.cnt_card!=null && player.list_card.length==0) {
+			for(var i=0; i<player.cnt_card; i++) {
+				player.list_card.push({'suit': '', 'rank': 'BCK'});
+			}
+		}
+	}
 	
 	this.calc_board_rotation();
 	this.calc_objects_rect();
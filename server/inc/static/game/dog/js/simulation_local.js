@@ -2,6 +2,8 @@ function Simulation(config) {
     this.config = config
     this.game = new Game(config.game_config);
     this.ws = null;
+    this.resync_requested = false;
+    this.stream = new StateStream();
     this.main();
 };
 Simulation.prototype.main = function(){
@@ -22,14 +24,42 @@ Simulation.prototype.ws_send = function(data) {
 Simulation.prototype.ws_onmessage = function(event) {
     var data = JSON.parse(event.data);
     this.add_log('> '+data.type);
+    if(data['type']=='batch') {
+        // several moves in one message (batch mode): apply them all, show the last one
+        var state = null;
+        for(var i=0; i<data['list_message'].length; i++) {
+            state = this.stream.apply_message(data['list_message'][i]);
+            if(state==null) {
+                this.request_resync();
+                return;
+            }
+        }
+        this.resync_requested = false;
+        data = {'type': 'update', 'state': state};
+    }
     switch(data['type']) {
         case 'update':
-            this.add_log(data['state']);
-            this.game.set_player_state(data['state']);
-            this.apply_action(data['state']['selected_action']);
+        case 'snapshot':
+        case 'delta':
+            var state = this.stream.apply_message(data);
+            if(state==null) {
+                this.request_resync();
+                break;
+            }
+            this.resync_requested = false;
+            this.add_log(state);
+            this.game.set_player_state(state);
+            this.apply_action(state['selected_action']);
             break;
     }
 };
+Simulation.prototype.request_resync = function() {
+    // a delta was missed, ask the server for a new snapshot (once)
+    if(!this.resync_requested) {
+        this.resync_requested = true;
+        this.ws_send({'type': 'resync'});
+    }
+};
 Simulation.prototype.add_log = function(msg) {
     //console.log(msg);
 };
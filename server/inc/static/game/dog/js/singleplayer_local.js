@@ -3,13 +3,21 @@ function Singleplayer(config) {
     this.game = new Game(config.game_config);
     this.game.send_action_callback = this.send_action.bind(this);
     this.ws = null;
+    this.resync_requested = false;
+    this.stream = new StateStream();
     this.main();
 };
 Singleplayer.prototype.main = function(){
     this.init_websocket();
 };
 Singleplayer.prototype.init_websocket = function(){
-    this.ws = new WebSocket(this.config.ws_endpoint);
+    var ws_endpoint = this.config.ws_endpoint;
+    var token = window.sessionStorage.getItem('seat_token ' + this.config.ws_endpoint);
+    if(token) {
+        // take the seat back after a reload (rooms only)
+        ws_endpoint += (ws_endpoint.indexOf('?') < 0 ? '?' : '&') + 'token=' + encodeURIComponent(token);
+    }
+    this.ws = new WebSocket(ws_endpoint);
     this.ws.onopen = this.ws_onopen.bind(this);
     this.ws.onmessage = this.ws_onmessage.bind(this);
 }
@@ -25,13 +33,31 @@ Singleplayer.prototype.ws_onmessage = function(event) {
     this.add_log('> '+data.type);
     switch(data['type']) {
         case 'update':
-    		this.game.set_player_state(data['state']);
+        case 'snapshot':
+        case 'delta':
+            var state = this.stream.apply_message(data);
+            if(state==null) {
+                this.request_resync();
+                break;
+            }
+            this.resync_requested = false;
+    		this.game.set_player_state(state);
     		//console.log(data['state']);
     		/*if(data['state']['idx_player_active']==data['state']['idx_player_you'] && data['state']['list_action'].length==0) {
     			this.send_action(null);
     		}*/
     		//this.apply_action(data['state']['selected_action']);
             break;
+        case 'seat':
+            window.sessionStorage.setItem('seat_token ' + this.config.ws_endpoint, data['token']);
+            break;
+    }
+};
+Singleplayer.prototype.request_resync = function() {
+    // a delta was missed, ask the server for a new snapshot (once)
+    if(!this.resync_requested) {
+        this.resync_requested = true;
+        this.ws_send({'type': 'resync'});
     }
 };
 Singleplayer.prototype.add_log = function(msg) {
@@ -0,0 +1,72 @@
+// Client side of the delta protocol of the websockets (see server/py/serialization.py):
+// the server sends a 'snapshot' followed by 'delta' messages with JSON-patch operations.
+function StateStream() {
+	this.state = null;
+	this.seq = 0;
+};
+
+StateStream.prototype.apply_message = function (data) {
+	// returns the full state of an 'update', 'snapshot' or 'delta' message (delta protocol),
+	// or null if the delta does not follow the last message and a resync is needed
+	if(data.type=='update') {
+		return data.state;
+	}
+	if(data.type=='snapshot') {
+		this.state = data.state;
+		this.seq = data.seq;
+	} else {
+		if(this.state==null || data.seq!=this.seq+1) {
+			this.state = null;
+			return null;
+		}
+		try {
+			for(var i=0; i<data.patch.length; i++) {
+				this.state = this.apply_patch_op(this.state, data.patch[i]);
+			}
+		} catch(e) {
+			console.log(e);
+			this.state = null;
+			return null;
+		}
+		this.seq = data.seq;
+	}
+	// the game may modify the returned state, the next patch needs the original
+	return JSON.parse(JSON.stringify(this.state));
+}
+
+StateStream.prototype.apply_patch_op = function (doc, op) {
+	// apply one JSON-patch operation (add, remove, replace) and return the document
+	if(op.path=='') {
+		return op.value;
+	}
+	var keys = op.path.substr(1).split('/');
+	for(var i=0; i<keys.length; i++) {
+		keys[i] = keys[i].replace(/~1/g, '/').replace(/~0/g, '~');
+	}
+	var parent = doc;
+	for(var i=0; i<keys.length-1; i++) {
+		parent = parent[keys[i]];
+		if(parent==null) {
+			throw 'Invalid patch path: '+op.path;
+		}
+	}
+	var key = keys[keys.length-1];
+	if(Array.isArray(parent)) {
+		if(op.op=='add') {
+			if(key=='-') {
+				parent.push(op.value);
+			} else {
+				parent.splice(parseInt(key), 0, op.value);
+			}
+		} else if(op.op=='remove') {
+			parent.splice(parseInt(key), 1);
+		} else {
+			parent[parseInt(key)] = op.value;
+		}
+	} else if(op.op=='remove') {
+		delete parent[key];
+	} else {
+		parent[key] = op.value;
+	}
+	return doc;
+}
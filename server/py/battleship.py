@@ -1,8 +1,205 @@
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, SupportsIndex, Tuple, cast
+from collections import Counter
 from enum import Enum
 import random
+import sys
+import numpy as np
 from server.py.game import Game, Player
 
+# Board cells are numbered 0..99 column by column: A1=0, A2=1, ..., A10=9, B1=10, ..., J10=99.
+# The ships, shots and hits of a player are kept as 100-bit integers (bitboards) with bit i set for
+# cell i: the location lists of the state objects are LocationLists that update their bitboard on
+# every change, so the rules never convert between strings and cells.
+BOARD_SIZE = 10
+CNT_CELLS = BOARD_SIZE * BOARD_SIZE
+
+# Cell index <-> location string, computed once (the strings are interned and shared by all actions)
+LOCATIONS: Tuple[str, ...] = tuple(sys.intern(f"{chr(65 + x)}{y + 1}")
+                                   for x in range(BOARD_SIZE) for y in range(BOARD_SIZE))
+LOCATION_INDEX: Dict[str, int] = {location: index for index, location in enumerate(LOCATIONS)}
+
+class Placement(NamedTuple):
+    """ A legal position of a ship: its bitboard, cells and location strings """
+    mask: int
+    cells: Tuple[int, ...]
+    locations: Tuple[str, ...]
+    is_vertical: bool
+    mask_ends: int  # bitboard of the cells just before and after the ship along its axis (if on the board)
+
+def _create_placements() -> Dict[Tuple[int, int, bool], Placement]:
+    """ All legal placements of ships of length 1..BOARD_SIZE, by (length, first cell, is_vertical) """
+    placements = {}
+    for length in range(1, BOARD_SIZE + 1):
+        for is_vertical in (False, True):
+            step = 1 if is_vertical else BOARD_SIZE  # vertical ships go down a column (A1, A2, ...)
+            for x in range(BOARD_SIZE - (0 if is_vertical else length - 1)):
+                for y in range(BOARD_SIZE - (length - 1 if is_vertical else 0)):
+                    start = x * BOARD_SIZE + y
+                    cells = tuple(start + i * step for i in range(length))
+                    first, last = (y, y + length - 1) if is_vertical else (x, x + length - 1)
+                    mask_ends = (1 << (start - step) if first > 0 else 0) | \
+                        (1 << (cells[-1] + step) if last < BOARD_SIZE - 1 else 0)
+                    placements[(length, start, is_vertical)] = Placement(
+                        sum(1 << cell for cell in cells), cells, tuple(LOCATIONS[cell] for cell in cells), is_vertical,
+                        mask_ends)
+    return placements
+
+PLACEMENT_AT: Dict[Tuple[int, int, bool], Placement] = _create_placements()
+# Distinct placements per length (a ship of length 1 has the same cells in both orientations)
+PLACEMENTS: Dict[int, List[Placement]] = {
+    length: [placement for (length_placement, _, is_vertical), placement in PLACEMENT_AT.items()
+             if length_placement == length and not (length == 1 and is_vertical)]
+    for length in range(1, BOARD_SIZE + 1)
+}
+
+# For each length and cell: bitset over PLACEMENTS[length] of the placements covering the cell
+CELL_PLACEMENTS: Dict[int, List[int]] = {
+    length: [sum(1 << idx for idx, placement in enumerate(PLACEMENTS[length]) if placement.mask >> cell & 1)
+             for cell in range(CNT_CELLS)]
+    for length in PLACEMENTS
+}
+
+class PlacementIndex:
+    """ The placements that do not overlap the occupied cells, per ship length, as bitsets over PLACEMENTS[length] """
+    def __init__(self, mask_occupied: int = 0) -> None:
+        self.mask_occupied = mask_occupied
+        self.free: Dict[int, int] = {}  # length -> bitset of free placements (computed on first use)
+
+    def get_free(self, length: int) -> int:
+        """ Return the bitset of free placements of the given length """
+        free = self.free.get(length)
+        if free is None:
+            free = (1 << len(PLACEMENTS[length])) - 1
+            cell_placements = CELL_PLACEMENTS[length]
+            mask = self.mask_occupied
+            while mask:
+                cell = (mask & -mask).bit_length() - 1
+                free &= ~cell_placements[cell]
+                mask &= mask - 1
+            self.free[length] = free
+        return free
+
+    def count(self, length: int) -> int:
+        """ Return the number of free placements of the given length """
+        return self.get_free(length).bit_count()
+
+    def occupy(self, mask: int) -> None:
+        """ Mark the cells of mask as occupied and remove the placements overlapping them """
+        self.mask_occupied |= mask
+        for length, free in self.free.items():
+            cell_placements = CELL_PLACEMENTS[length]
+            cells = mask
+            while cells:
+                cell = (cells & -cells).bit_length() - 1
+                free &= ~cell_placements[cell]
+                cells &= cells - 1
+            self.free[length] = free
+
+    def sample(self, length: int, rng: random.Random) -> Optional[Placement]:
+        """ Draw one of the free placements of the given length uniformly (None if there is none) """
+        free = self.get_free(length)
+        cnt = free.bit_count()
+        if cnt == 0:
+            return None
+        for _ in range(rng.randrange(cnt)):
+            free &= free - 1
+        return PLACEMENTS[length][(free & -free).bit_length() - 1]
+
+def location_to_index(location: str) -> Optional[int]:
+    """ Return the cell index of a location like 'C7', or None if it is not on the board """
+    return LOCATION_INDEX.get(location)
+
+def index_to_location(index: int) -> str:
+    """ Return the location string of a cell index """
+    return LOCATIONS[index]
+
+def locations_to_mask(locations: Optional[Iterable[str]]) -> int:
+    """ Return the bitboard of the given locations (locations not on the board are ignored) """
+    mask = 0
+    for location in locations or ():
+        index = LOCATION_INDEX.get(location)
+        if index is not None:
+            mask |= 1 << index
+    return mask
+
+class LocationList(List[str]):
+    """ A list of location strings that keeps the bitboard of its locations in mask """
+    __slots__ = ('mask',)
+
+    def __init__(self, locations: Iterable[str] = ()) -> None:
+        super().__init__(locations)
+        self.mask = locations_to_mask(self)
+
+    def _add(self, location: str) -> None:
+        index = LOCATION_INDEX.get(location)
+        if index is not None:
+            self.mask |= 1 << index
+
+    def _discard(self, location: str) -> None:
+        index = LOCATION_INDEX.get(location)
+        if index is not None and location not in self:
+            self.mask &= ~(1 << index)
+
+    def _update(self) -> None:
+        self.mask = locations_to_mask(self)
+
+    def append(self, location: str) -> None:
+        super().append(location)
+        self._add(location)
+
+    def insert(self, index: SupportsIndex, location: str) -> None:
+        super().insert(index, location)
+        self._add(location)
+
+    def extend(self, locations: Iterable[str]) -> None:
+        super().extend(locations)
+        self._update()
+
+    def __iadd__(self, locations: Iterable[str]) -> 'LocationList':  # type: ignore[override, misc]
+        self.extend(locations)
+        return self
+
+    def pop(self, index: SupportsIndex = -1) -> str:
+        location = super().pop(index)
+        self._discard(location)
+        return location
+
+    def remove(self, location: str) -> None:
+        super().remove(location)
+        self._discard(location)
+
+    def clear(self) -> None:
+        super().clear()
+        self.mask = 0
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        super().__setitem__(index, value)
+        self._update()
+
+    def __delitem__(self, index: Any) -> None:
+        super().__delitem__(index)
+        self._update()
+
+    def __imul__(self, count: SupportsIndex) -> 'LocationList':
+        super().__imul__(count)
+        self._update()
+        return self
+
+    def copy(self) -> 'LocationList':
+        locations = LocationList()
+        list.extend(locations, self)
+        locations.mask = self.mask
+        return locations
+
+    def __reduce__(self) -> Tuple[type, Tuple[List[str]]]:
+        return LocationList, (list(self),)
+
+def as_location_list(locations: Iterable[str]) -> LocationList:
+    """ Return the locations as a LocationList (kept as is if it already is one) """
+    if isinstance(locations, LocationList):
+        return locations
+    return LocationList(locations)
+
 
 # Enums and Constants
 class ActionType(str, Enum):
@@ -25,33 +222,102 @@ class Ship:
     def __init__(self, name: str, length: int, location: Optional[List[str]] = None) -> None:
         self.name = name
         self.length = length
-        self.location = location if location is not None else []  # List of grid coordinates occupied by the ship
+        self.location: Optional[List[str]] = location if location is not None else []  # Grid coordinates of the ship
         self.hits = 0       # Count of hits on the ship
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == 'location' and value is not None:
+            value = as_location_list(value)
+        super().__setattr__(name, value)
+
     def is_sunk(self) -> bool:
         return self.hits >= self.length
 
+    def get_mask(self) -> int:
+        """ Bitboard of the ship's cells """
+        return 0 if self.location is None else cast(LocationList, self.location).mask
+
+    def clone(self) -> 'Ship':
+        ship = Ship(self.name, self.length)
+        ship.location = None if self.location is None else cast(LocationList, self.location).copy()
+        ship.hits = self.hits
+        return ship
+
 class PlayerState:
-    def __init__(self, name: str, ships: List[Ship], shots: Optional[List[str]] = None, successful_shots: Optional[List[str]] = None) -> None:
+    def __init__(self, name: str, ships: List[Ship], shots: Optional[List[str]] = None,
+                 successful_shots: Optional[List[str]] = None) -> None:
         self.name = name
         self.ships = ships
         self.shots = shots if shots is not None else []  # All attempted shots
         self.successful_shots = successful_shots if successful_shots is not None else []  # Successful hits
 
-    def all_ships_sunk(self) -> bool:
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in ('shots', 'successful_shots'):
+            value = as_location_list(value)
+        super().__setattr__(name, value)
+
+    def all_ships_sunk(self, mask_hits: Optional[int] = None) -> bool:
+        """ True if all ships are sunk, by their hit counts or (if given) by the opponent's bitboard of hits """
+        if mask_hits is not None:
+            masks = [ship.get_mask() for ship in self.ships]
+            return all(mask and mask & ~mask_hits == 0 for mask in masks)
         return all(ship.is_sunk() for ship in self.ships)
 
+    def get_mask_ships(self) -> int:
+        """ Bitboard of the cells of all ships """
+        mask = 0
+        for ship in self.ships:
+            mask |= ship.get_mask()
+        return mask
+
+    def get_mask_shots(self) -> int:
+        """ Bitboard of the cells shot at """
+        return cast(LocationList, self.shots).mask
+
+    def get_mask_hits(self) -> int:
+        """ Bitboard of the successful shots """
+        return cast(LocationList, self.successful_shots).mask
+
+    def add_shot(self, location: str, hit: bool) -> None:
+        """ Record a shot in the lists (and their bitboards) """
+        self.shots.append(location)
+        if hit:
+            self.successful_shots.append(location)
+
+    def clone(self) -> 'PlayerState':
+        return PlayerState(self.name, [ship.clone() for ship in self.ships],
+                           cast(LocationList, self.shots).copy(), cast(LocationList, self.successful_shots).copy())
+
 class BattleshipGameState:
-    def __init__(self, idx_player_active: int, phase: GamePhase, winner: Optional[int], players: List[PlayerState]) -> None:
+    def __init__(self, idx_player_active: int, phase: GamePhase, winner: Optional[int],
+                 players: List[PlayerState]) -> None:
         self.idx_player_active = idx_player_active
         self.phase = phase
         self.winner = winner
         self.players = players
 
+    def clone(self) -> 'BattleshipGameState':
+        """ Copy only the mutable containers (lists of ships, locations and shots) """
+        return BattleshipGameState(self.idx_player_active, self.phase, self.winner,
+                                   [player.clone() for player in self.players])
+
+class UndoRecord:
+    """ Everything needed to revert one applied action """
+    def __init__(self, action_type: ActionType, idx_player_active: int, phase: GamePhase, winner: Optional[int],
+                 ship: Optional[Ship] = None, location: Optional[List[str]] = None) -> None:
+        self.action_type = action_type
+        self.idx_player_active = idx_player_active
+        self.phase = phase
+        self.winner = winner
+        self.ship = ship            # ship that was placed or hit
+        self.location = location    # previous location of a placed ship
+
 # Main Game Class
 class Battleship:
-    def __init__(self):
-        """ Initialize the game """
+    def __init__(self, seed: Optional[int] = None, rng: Optional[random.Random] = None):
+        """ Initialize the game (pass a seed or a random number generator for reproducible ship placement) """
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.undo_stack: List[UndoRecord] = []
         self.state = BattleshipGameState(
             idx_player_active=0,
             phase=GamePhase.SETUP,
@@ -74,21 +340,21 @@ class Battleship:
 
     def place_ship_randomly(self, ship: Ship, occupied_locations: set) -> None:
         """ Randomly place a ship on the board either horizontally or vertically without overlap """
-        while True:
-            orientation = random.choice(['horizontal', 'vertical'])
-            if orientation == 'horizontal':
-                start_x = random.randint(1, 10 - ship.length + 1)
-                start_y = random.randint(1, 10)
-                new_location = [f"{chr(64 + start_x + i)}{start_y}" for i in range(ship.length)]
-            else:
-                start_x = random.randint(1, 10)
-                start_y = random.randint(1, 10 - ship.length + 1)
-                new_location = [f"{chr(64 + start_x)}{start_y + i}" for i in range(ship.length)]
-
-            if not any(loc in occupied_locations for loc in new_location):
-                ship.location = new_location
-                occupied_locations.update(new_location)
-                break
+        placement = PlacementIndex(locations_to_mask(occupied_locations)).sample(ship.length, self.rng)
+        if placement is None:
+            raise ValueError(f"There is no free place for ship '{ship.name}'.")
+        ship.location = LocationList(placement.locations)
+        occupied_locations.update(placement.locations)
+
+    def place_ships_randomly(self, ships: List[Ship]) -> None:
+        """ Place all ships without overlap, drawing each ship uniformly from the places still free """
+        index = PlacementIndex()
+        for ship in ships:
+            placement = index.sample(ship.length, self.rng)
+            if placement is None:
+                raise ValueError(f"There is no free place for ship '{ship.name}'.")
+            ship.location = LocationList(placement.locations)
+            index.occupy(placement.mask)
 
     def print_state(self) -> None:
         """ Print the current state for debugging """
@@ -106,6 +372,7 @@ class Battleship:
 
     def set_state(self, state: BattleshipGameState) -> None:
         self.state = state
+        self.undo_stack = []
 
     def get_list_action(self) -> List[BattleshipAction]:
         """ Return possible actions for the active player """
@@ -117,12 +384,9 @@ class Battleship:
                 if not ship.location:
                     actions.append(BattleshipAction(ActionType.SET_SHIP, ship.name, []))
         elif self.state.phase == GamePhase.RUNNING:
-            all_shots = active_player.shots
-            for x in range(1, 11):
-                for y in range(1, 11):
-                    location = f"{chr(64 + x)}{y}"
-                    if location not in all_shots:
-                        actions.append(BattleshipAction(ActionType.SHOOT, None, [location]))
+            mask_shots = active_player.get_mask_shots()
+            actions = [BattleshipAction(ActionType.SHOOT, None, [location])
+                       for index, location in enumerate(LOCATIONS) if not mask_shots >> index & 1]
 
         return actions
 
@@ -130,10 +394,12 @@ class Battleship:
         """ Apply the given action to the game """
         active_player = self.state.players[self.state.idx_player_active]
         opponent = self.state.players[1 - self.state.idx_player_active]
+        record = UndoRecord(action.action_type, self.state.idx_player_active, self.state.phase, self.state.winner)
 
         if action.action_type == ActionType.SET_SHIP:
             for ship in active_player.ships:
                 if ship.name == action.ship_name:
+                    record.ship, record.location = ship, ship.location
                     ship.location = action.location
                     break
 
@@ -147,27 +413,51 @@ class Battleship:
 
         elif action.action_type == ActionType.SHOOT:
             location = action.location[0]
-            active_player.shots.append(location)
+            index = location_to_index(location)
+            bit = 0 if index is None else 1 << index
 
             hit = False
-            for ship in opponent.ships:
-                if location in ship.location:
-                    ship.hits += 1
-                    active_player.successful_shots.append(location)
-                    hit = True
-                    break
+            if bit & opponent.get_mask_ships():
+                for ship in opponent.ships:
+                    if bit & ship.get_mask():
+                        ship.hits += 1
+                        record.ship = ship
+                        hit = True
+                        break
+            active_player.add_shot(location, hit)
 
             if not hit:
                 print(f"{location} was a miss!")
 
             # Check if the game is over
-            if opponent.all_ships_sunk():
+            if opponent.all_ships_sunk(active_player.get_mask_hits()):
                 self.state.phase = GamePhase.FINISHED
                 self.state.winner = self.state.idx_player_active
 
             # Switch turns
             self.state.idx_player_active = 1 - self.state.idx_player_active
 
+        self.undo_stack.append(record)
+
+    def undo_action(self) -> None:
+        """ Undo the last applied action """
+        if not self.undo_stack:
+            raise ValueError("There is no action to undo.")
+        record = self.undo_stack.pop()
+        self.state.idx_player_active = record.idx_player_active
+        self.state.phase = record.phase
+        self.state.winner = record.winner
+        active_player = self.state.players[record.idx_player_active]
+
+        if record.action_type == ActionType.SET_SHIP:
+            if record.ship is not None:
+                record.ship.location = record.location
+        elif record.action_type == ActionType.SHOOT:
+            active_player.shots.pop()
+            if record.ship is not None:
+                record.ship.hits -= 1
+                active_player.successful_shots.pop()
+
     def get_player_view(self, idx_player: int) -> BattleshipGameState:
         """ Get the masked state for the active player """
         masked_state = BattleshipGameState(
@@ -191,14 +481,230 @@ class Battleship:
 
 # Random Player Implementation
 class RandomPlayer(PlayerState):
-    def __init__(self, name: str = "Random Player"):
+    def __init__(self, name: str = "Random Player", seed: Optional[int] = None, rng: Optional[random.Random] = None):
         super().__init__(name, ships=[])
+        self.rng = rng if rng is not None else random.Random(seed)
 
     def select_action(self, state: BattleshipGameState, actions: List[BattleshipAction]) -> Optional[BattleshipAction]:
         if actions:
-            return random.choice(actions)
+            return self.rng.choice(actions)
         return None
 
+def mask_to_array(mask: int) -> np.ndarray:
+    """ Convert a bitboard to a float array of 0/1 with one entry per cell """
+    data = np.frombuffer(mask.to_bytes(13, 'little'), dtype=np.uint8)
+    return np.unpackbits(data, count=CNT_CELLS, bitorder='little').astype(np.float64)
+
+# For each length: matrix with one row per placement in PLACEMENTS[length] and a 1 for each cell it covers
+PLACEMENT_MATRIX: Dict[int, np.ndarray] = {
+    length: np.array([mask_to_array(placement.mask) for placement in placements])
+    for length, placements in PLACEMENTS.items()
+}
+
+# Hunt/Target Player Implementation
+class HuntTargetPlayer(PlayerState):
+    """ Shoots at the cell covered by most placements of the opponent's ships afloat that fit the shots so far
+
+    The view does not tell which ships are sunk, so they are inferred from the own shots (see infer_sunk()).
+    Placements over a miss or a sunk ship are ruled out. Without hits on ships afloat (hunt) every such
+    placement counts once; with hits (target) only the placements over hits count, each once per hit.
+    """
+
+    def __init__(self, name: str = "Hunt/Target Player", seed: Optional[int] = None,
+                 rng: Optional[random.Random] = None):
+        super().__init__(name, ships=[])
+        self.rng = rng if rng is not None else random.Random(seed)
+
+    def infer_sunk(self, mask_shots: int, mask_hits: int, lengths: Iterable[int]) -> Tuple[int, List[int]]:
+        """ Bitboard of the ships taken as sunk and the lengths of the ships still afloat
+
+        A ship is taken as sunk when a run of hits has its length and both ends of the run are misses or the
+        edge of the board. The longest ships are matched first, each hit belongs to at most one sunk ship.
+        """
+        mask_misses = mask_shots & ~mask_hits
+        mask_sunk = 0
+        lengths_afloat = []
+        for length in sorted(lengths, reverse=True):
+            hits = mask_hits & ~mask_sunk
+            cells = hits
+            found = None
+            while cells and found is None:
+                cell = (cells & -cells).bit_length() - 1
+                cells &= cells - 1
+                for is_vertical in (True, False):
+                    placement = PLACEMENT_AT.get((length, cell, is_vertical))
+                    if placement is not None and placement.mask & ~hits == 0 \
+                            and placement.mask_ends & ~mask_misses == 0:
+                        found = placement
+                        break
+            if found is None:
+                lengths_afloat.append(length)
+            else:
+                mask_sunk |= found.mask
+        return mask_sunk, lengths_afloat
+
+    def get_heat_map(self, mask_shots: int, mask_hits: int, lengths: Iterable[int], mask_sunk: int = 0) -> np.ndarray:
+        """ Number of placements of the ships of the given lengths over each cell (0 if shot at) """
+        blocked = mask_to_array((mask_shots & ~mask_hits) | mask_sunk)
+        hits = mask_to_array(mask_hits & ~mask_sunk)
+        counts = Counter(lengths)
+        heat = np.zeros(CNT_CELLS)
+        if mask_hits & ~mask_sunk:
+            for length, cnt in counts.items():
+                matrix = PLACEMENT_MATRIX[length]
+                heat += cnt * (((matrix @ blocked == 0) * (matrix @ hits)) @ matrix)
+            heat[mask_to_array(mask_shots) > 0] = 0.0
+        if not heat.any():
+            for length, cnt in counts.items():
+                matrix = PLACEMENT_MATRIX[length]
+                heat += cnt * ((matrix @ blocked == 0) @ matrix)
+            heat[mask_to_array(mask_shots) > 0] = 0.0
+        return heat
+
+    def select_action(self, state: BattleshipGameState, actions: List[BattleshipAction]) -> Optional[BattleshipAction]:
+        if not actions:
+            return None
+        player = state.players[state.idx_player_active]
+        if actions[0].action_type == ActionType.SET_SHIP:
+            # the actions leave the location open: place the ship away from the own ships already set
+            ship = next(ship for ship in player.ships if ship.name == actions[0].ship_name)
+            placement = PlacementIndex(player.get_mask_ships()).sample(ship.length, self.rng)
+            if placement is None:
+                return actions[0]
+            return BattleshipAction(ActionType.SET_SHIP, ship.name, list(placement.locations))
+
+        opponent = state.players[1 - state.idx_player_active]
+        mask_shots, mask_hits = player.get_mask_shots(), player.get_mask_hits()
+        mask_sunk, lengths = self.infer_sunk(mask_shots, mask_hits, [ship.length for ship in opponent.ships])
+        heat = self.get_heat_map(mask_shots, mask_hits, lengths, mask_sunk)
+        if not heat.any():
+            # the inferred sunk ships leave no place for the ships afloat: the inference was wrong
+            heat = self.get_heat_map(mask_shots, mask_hits, [ship.length for ship in opponent.ships])
+        action_at = {location_to_index(action.location[0]): action for action in actions}
+        cells = np.fromiter(action_at, dtype=np.int64, count=len(action_at))
+        heat_cells = heat[cells]
+        best = cells[heat_cells == heat_cells.max()]
+        return action_at[int(best[self.rng.randrange(len(best))])]
+
+# Batch Simulation
+class BattleshipBatch:
+    """ K games in the shooting phase, played in lockstep on NumPy arrays
+
+    ships[k, p] marks the cells of the ships of player p in game k and shots[k, p] the cells player p
+    shot at (on the opponent's board), both bool arrays of shape (K, 2, CNT_CELLS). apply_action() takes
+    one cell per game for the active players and follows the rules of Battleship.apply_action().
+    """
+    def __init__(self, ships: np.ndarray, shots: Optional[np.ndarray] = None,
+                 idx_player_active: Optional[np.ndarray] = None, winner: Optional[np.ndarray] = None) -> None:
+        self.ships = np.asarray(ships, dtype=bool)
+        self.cnt_games = self.ships.shape[0]
+        self.shots = np.zeros_like(self.ships) if shots is None else np.asarray(shots, dtype=bool)
+        self.idx_player_active = (np.zeros(self.cnt_games, dtype=np.int64) if idx_player_active is None
+                                  else np.asarray(idx_player_active, dtype=np.int64))
+        self.winner = (np.full(self.cnt_games, -1, dtype=np.int64) if winner is None
+                       else np.asarray(winner, dtype=np.int64))
+        self._games = np.arange(self.cnt_games)
+
+    @classmethod
+    def from_games(cls, games: Sequence[Battleship]) -> 'BattleshipBatch':
+        """ Copy the ships, shots, active player and winner of the given games """
+        ships = np.zeros((len(games), 2, CNT_CELLS), dtype=bool)
+        shots = np.zeros((len(games), 2, CNT_CELLS), dtype=bool)
+        for idx_game, game in enumerate(games):
+            for idx_player, player in enumerate(game.state.players):
+                ships[idx_game, idx_player] = mask_to_array(player.get_mask_ships()) > 0
+                shots[idx_game, idx_player] = mask_to_array(player.get_mask_shots()) > 0
+        idx_player_active = [game.state.idx_player_active for game in games]
+        winner = [-1 if game.state.winner is None else game.state.winner for game in games]
+        return cls(ships, shots, np.array(idx_player_active), np.array(winner))
+
+    @classmethod
+    def from_seeds(cls, seeds: Iterable[int]) -> 'BattleshipBatch':
+        """ The games Battleship(seed=seed) with the fleets of both players set by place_ships_randomly() """
+        games = []
+        for seed in seeds:
+            game = Battleship(seed=seed)
+            for player in game.state.players:
+                game.place_ships_randomly(player.ships)
+            game.state.phase = GamePhase.RUNNING
+            games.append(game)
+        return cls.from_games(games)
+
+    @classmethod
+    def random(cls, cnt_games: int, rng: np.random.Generator,
+               lengths: Optional[Sequence[int]] = None) -> 'BattleshipBatch':
+        """ cnt_games new games, each ship drawn uniformly from the places still free (like PlacementIndex) """
+        if lengths is None:
+            lengths = [ship.length for ship in Battleship().create_ships()]
+        occupied = np.zeros((cnt_games * 2, CNT_CELLS))
+        for length in lengths:
+            matrix = PLACEMENT_MATRIX[length]
+            free = occupied @ matrix.T == 0
+            choice = np.argmax(np.where(free, rng.random(free.shape), -1.0), axis=1)
+            occupied += matrix[choice]
+        return cls(occupied.reshape(cnt_games, 2, CNT_CELLS) > 0)
+
+    def is_finished(self) -> np.ndarray:
+        """ Bool array: the games that have a winner """
+        return self.winner >= 0
+
+    def get_mask_action(self) -> np.ndarray:
+        """ Bool array (K, CNT_CELLS): the cells the active player has not shot at yet (none if finished) """
+        mask: np.ndarray = ~self.shots[self._games, self.idx_player_active]
+        mask[self.is_finished()] = False
+        return mask
+
+    def get_random_action(self, rng: np.random.Generator) -> np.ndarray:
+        """ A cell drawn uniformly from get_mask_action() for each game (-1 for the finished games) """
+        mask = self.get_mask_action()
+        cells = np.full(self.cnt_games, -1, dtype=np.int64)
+        games = self._games[mask.any(axis=1)]
+        for _ in range(4):
+            # draw any cell and keep it if it is free (cheap while most of the board is free)
+            if len(games) == 0:
+                return cells
+            guess = rng.integers(CNT_CELLS, size=len(games))
+            is_free = mask[games, guess]
+            cells[games[is_free]] = guess[is_free]
+            games = games[~is_free]
+        if len(games) > 0:
+            # the nth free cell (counting from 0) of the remaining games
+            cumulative = np.cumsum(mask[games], axis=1, dtype=np.int16)
+            nth = (rng.random(len(games)) * cumulative[:, -1]).astype(np.int16)
+            cells[games] = (cumulative <= nth[:, None]).sum(axis=1)
+        return cells
+
+    def apply_action(self, cells: np.ndarray) -> np.ndarray:
+        """ The active player of each unfinished game shoots at cells[k]; return the bool array of hits """
+        cells = np.asarray(cells)
+        hit = np.zeros(self.cnt_games, dtype=bool)
+        games = self._games[self.winner < 0]
+        cell = cells[games]
+        if np.any((cell < 0) | (cell >= CNT_CELLS)):
+            raise ValueError("Every unfinished game needs a cell to shoot at.")
+        active = self.idx_player_active[games]
+        self.shots[games, active, cell] = True
+        hit[games] = self.ships[games, 1 - active, cell]
+
+        # only a hit can end a game: check if the opponent has a ship cell left that was not shot at
+        games_hit = self._games[hit]
+        if len(games_hit) > 0:
+            active_hit = self.idx_player_active[games_hit]
+            left = self.ships[games_hit, 1 - active_hit] & ~self.shots[games_hit, active_hit]
+            sunk = ~left.any(axis=1)
+            self.winner[games_hit[sunk]] = active_hit[sunk]
+
+        self.idx_player_active[games] = 1 - active
+        return hit
+
+    def play(self, policy: Callable[['BattleshipBatch'], np.ndarray], max_steps: int = 2 * CNT_CELLS) -> np.ndarray:
+        """ Apply the cells chosen by policy(self) until all games are finished; return the winners """
+        for _ in range(max_steps):
+            if self.is_finished().all():
+                break
+            self.apply_action(policy(self))
+        return self.winner
+
 if __name__ == "__main__":
     game = Battleship()
     player1 = RandomPlayer("Player 1")
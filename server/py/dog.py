@@ -1,13 +1,11 @@
-import copy
 import logging
 import random
+from collections import deque
 from enum import Enum
-from typing import List, Optional, ClassVar
-from pydantic import BaseModel
+from typing import Any, Callable, ClassVar, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from pydantic import BaseModel, ConfigDict
 from server.py.game import Game, Player
 
-from typing import Any, Callable
-
 def log_method_call(func: Callable[..., Any]) -> Callable[..., Any]:
     """Decorator to log method calls."""
     def wrapper(*args: tuple[Any, ...], **kwargs: dict[str, Any]) -> Any:
@@ -17,13 +15,29 @@ def log_method_call(func: Callable[..., Any]) -> Callable[..., Any]:
         return result
     return wrapper
 
+# Integer id of every distinct card: one per suit and rank plus one for the joker
+CARD_IDS: Dict[Tuple[str, str], int] = {
+    (suit, rank): idx_rank * 4 + idx_suit
+    for idx_rank, rank in enumerate(['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A'])
+    for idx_suit, suit in enumerate(['♠', '♥', '♦', '♣'])
+}
+CARD_IDS[('', 'JKR')] = len(CARD_IDS)
+
 class Card(BaseModel):
-    """Represents a playing card with a suit and rank."""
+    """Represents an immutable playing card with a suit and rank."""
+    model_config = ConfigDict(frozen=True)
     suit: str
     rank: str
 
+    @property
+    def card_id(self) -> int:
+        """Return the integer id of the card (-1 for cards not in the deck)."""
+        return CARD_IDS.get((self.suit, self.rank), -1)
+
     def __eq__(self, other: object) -> bool:
-        """Check if two cards are equal based on suit and rank."""
+        """Check if two cards are equal based on identity or suit and rank."""
+        if self is other:
+            return True
         if not isinstance(other, Card):
             return False
         return self.suit == other.suit and self.rank == other.rank
@@ -36,6 +50,9 @@ class Card(BaseModel):
 
     def __hash__(self) -> int:
         """Generate a hash value for the card."""
+        card_id = CARD_IDS.get((self.suit, self.rank), -1)
+        if card_id >= 0:
+            return card_id
         return hash((self.suit, self.rank))
 
     def __str__(self) -> str:
@@ -46,16 +63,48 @@ class Card(BaseModel):
         """Return a string representation of the card."""
         return self.__str__()
 
+# Interned card instances, indexed by card id
+CARD_BY_ID: List[Card] = [Card(suit=suit, rank=rank) for suit, rank in CARD_IDS]
+
+def get_card(suit: str, rank: str) -> Card:
+    """Return the interned instance of a card."""
+    return CARD_BY_ID[CARD_IDS[(suit, rank)]]
+
 class Marble(BaseModel):
     """Represents a marble with a position and save status."""
     pos: int
     is_save: bool
 
+    def clone(self) -> 'Marble':
+        """Return a copy of the marble without validation."""
+        return Marble.model_construct(_fields_set=self.model_fields_set, pos=self.pos, is_save=self.is_save)
+
 class PlayerState(BaseModel):
     """Represents the state of a player, including name, cards, and marbles."""
     name: str
     list_card: List[Card]
     list_marble: List[Marble]
+    cnt_card: Optional[int] = None  # number of cards in a masked hand (player view of an opponent)
+
+    def clone(self) -> 'PlayerState':
+        """Return a copy sharing the cards, with new card and marble lists (no validation)."""
+        return PlayerState.model_construct(
+            _fields_set=self.model_fields_set,
+            name=self.name,
+            list_card=list(self.list_card),
+            list_marble=[marble.clone() for marble in self.list_marble],
+            cnt_card=self.cnt_card
+        )
+
+    def masked(self) -> 'PlayerState':
+        """Return a copy for the other players: the hand is replaced by its number of cards."""
+        return PlayerState.model_construct(
+            _fields_set=self.model_fields_set | {'cnt_card'},
+            name=self.name,
+            list_card=[],
+            list_marble=[marble.clone() for marble in self.list_marble],
+            cnt_card=len(self.list_card)
+        )
 
 class Action(BaseModel):
     """Represents an action in the game, including card, positions, and optional card swap."""
@@ -64,6 +113,34 @@ class Action(BaseModel):
     pos_to: Optional[int]
     card_swap: Optional[Card] = None
 
+    def get_code(self) -> int:
+        """Pack card id, positions and swap card id into one int (-1 if the action can not be encoded)."""
+        card_id = self.card.card_id
+        swap_id = -1 if self.card_swap is None else self.card_swap.card_id
+        pos_from = -1 if self.pos_from is None else self.pos_from
+        pos_to = -1 if self.pos_to is None else self.pos_to
+        if card_id < 0 or (self.card_swap is not None and swap_id < 0) \
+                or not -1 <= pos_from < 127 or not -1 <= pos_to < 127:
+            return -1
+        return ((card_id + 1) << 20) | ((pos_from + 1) << 13) | ((pos_to + 1) << 6) | (swap_id + 1)
+
+    def __eq__(self, other: object) -> bool:
+        """Check if two actions are equal based on their code (or their fields if not encodable)."""
+        if not isinstance(other, Action):
+            return False
+        code = self.get_code()
+        if code >= 0:
+            return code == other.get_code()
+        return (self.card, self.pos_from, self.pos_to, self.card_swap) == \
+            (other.card, other.pos_from, other.pos_to, other.card_swap)
+
+    def __hash__(self) -> int:
+        """Generate a hash value for the action."""
+        code = self.get_code()
+        if code >= 0:
+            return code
+        return hash((self.card, self.pos_from, self.pos_to, self.card_swap))
+
 class GamePhase(str, Enum):
     """Enumeration of game phases."""
     SETUP = 'setup'
@@ -108,11 +185,147 @@ class GameState(BaseModel):
     seven_steps_remaining: Optional[int] = None
     seven_backup_state: Optional['GameState'] = None
     seven_player_idx: Optional[int] = None
+    cnt_card_draw: Optional[int] = None  # number of cards in the masked draw pile (player view)
+
+    def clone(self) -> 'GameState':
+        """Return a structural copy: cards are shared, only the mutable containers are copied (no validation)."""
+        return GameState.model_construct(
+            _fields_set=self.model_fields_set,
+            cnt_player=self.cnt_player,
+            phase=self.phase,
+            cnt_round=self.cnt_round,
+            bool_game_finished=self.bool_game_finished,
+            bool_card_exchanged=self.bool_card_exchanged,
+            idx_player_started=self.idx_player_started,
+            idx_player_active=self.idx_player_active,
+            list_player=[player.clone() for player in self.list_player],
+            list_card_draw=list(self.list_card_draw),
+            list_card_discard=list(self.list_card_discard),
+            card_active=self.card_active,
+            seven_steps_remaining=self.seven_steps_remaining,
+            seven_backup_state=None if self.seven_backup_state is None else self.seven_backup_state.clone(),
+            seven_player_idx=self.seven_player_idx,
+            cnt_card_draw=self.cnt_card_draw
+        )
+
+    def masked(self, idx_player: int) -> 'GameState':
+        """Return the view of player idx_player: other hands and the draw pile as counts, no backup state."""
+        return GameState.model_construct(
+            _fields_set=self.model_fields_set | {'cnt_card_draw'},
+            cnt_player=self.cnt_player,
+            phase=self.phase,
+            cnt_round=self.cnt_round,
+            bool_game_finished=self.bool_game_finished,
+            bool_card_exchanged=self.bool_card_exchanged,
+            idx_player_started=self.idx_player_started,
+            idx_player_active=self.idx_player_active,
+            list_player=[player.clone() if idx == idx_player else player.masked()
+                         for idx, player in enumerate(self.list_player)],
+            list_card_draw=[],
+            list_card_discard=list(self.list_card_discard),
+            card_active=self.card_active,
+            seven_steps_remaining=self.seven_steps_remaining,
+            seven_backup_state=None,
+            seven_player_idx=self.seven_player_idx,
+            cnt_card_draw=len(self.list_card_draw)
+        )
+
+# Steps a marble can move on the board for each card rank
+MOVE_OPTIONS: Dict[str, List[int]] = {
+    'A': [1, 11],
+    '2': [2],
+    '3': [3],
+    '4': [4, -4],
+    '5': [5],
+    '6': [6],
+    '7': [1, 2, 3, 4, 5, 6, 7],
+    '8': [8],
+    '9': [9],
+    '10': [10],
+    'Q': [12],
+    'K': [13],
+    'JKR': []
+}
+
+
+# Card ids of the full deck of 110 cards (LIST_CARD twice), shuffled to deal
+DECK_CARD_IDS: List[int] = [card.card_id for card in GameState.LIST_CARD] * 2
+
+
+class MoveTarget(NamedTuple):
+    """A candidate destination for a marble, with the squares that must not be blocked on the way."""
+    step: int
+    pos_to: int
+    path: Optional[Tuple[int, ...]]  # None if the move is never possible on the board
+    is_finish: bool
+
+
+class UndoRecord(NamedTuple):
+    """A reversible change to the game state: a marble move (incl. captures) or a card removal."""
+    kind: str  # 'marble' or 'card'
+    idx: int  # slot of the marble or index of the player
+    pos: int  # previous position of the marble or index of the card in the hand
+    is_save: bool = False
+    card: Optional[Card] = None
+
+
+class UndoFrame(NamedTuple):
+    """Everything apply_action can change, captured before the action (cards are shared, not copied)."""
+    state: GameState
+    fields: Dict[str, Any]
+    list_hand: List[List[Card]]
+    list_card_draw: List[Card]
+    list_card_discard: List[Card]
+    marble_pos: List[int]
+    save_mask: int
+    undo_log: Optional[List[UndoRecord]]
+
+
+def _build_move_table(cnt_steps: int = 64, cnt_players: int = 4, cnt_balls: int = 4) -> Dict[Tuple[str, int, int], List[MoveTarget]]:
+    """Precompute the move targets for every (card rank, board position, player seat)."""
+    table: Dict[Tuple[str, int, int], List[MoveTarget]] = {}
+    for rank, steps_list in MOVE_OPTIONS.items():
+        for seat in range(cnt_players):
+            pos_finish = cnt_steps + seat * cnt_balls * 2 + cnt_balls
+            pos_start = seat * (cnt_steps // cnt_players)
+            for pos_from in range(cnt_steps):
+                targets = []
+                for step in steps_list:
+                    # Regular board move (targets behind pos_from are treated as blocked)
+                    new_pos = (pos_from + step) % cnt_steps
+                    path = None
+                    if pos_from < new_pos:
+                        path = tuple(pos % cnt_steps for pos in range(pos_from + 1, new_pos + 1))
+                    targets.append(MoveTarget(step, new_pos, path, False))
+
+                    # Finish moves from the position that reaches each finish field with this step
+                    for i in range(cnt_balls):
+                        pos_to = pos_finish + i
+                        if pos_to - step < pos_finish:
+                            pos_required = (pos_start - step + (pos_to - pos_finish + 1) + cnt_steps) % cnt_steps
+                        else:
+                            pos_required = pos_to - step
+                        if pos_required == pos_from:
+                            targets.append(MoveTarget(step, pos_to, (), True))
+                table[(rank, pos_from, seat)] = targets
+    return table
+
+
+MOVE_TABLE = _build_move_table()
+
 
 class Dog(Game):
-    def __init__(self) -> None:
-        """Game initialization"""
+    # Scalar fields of GameState restored by undo_action
+    UNDO_FIELDS: ClassVar[Tuple[str, ...]] = (
+        'cnt_player', 'phase', 'cnt_round', 'bool_game_finished', 'bool_card_exchanged',
+        'idx_player_started', 'idx_player_active', 'card_active',
+        'seven_steps_remaining', 'seven_backup_state', 'seven_player_idx'
+    )
+
+    def __init__(self, seed: Optional[int] = None, rng: Optional[random.Random] = None) -> None:
+        """Game initialization (pass a seed or a random number generator for reproducible games)"""
         super().__init__()
+        self._rng = rng if rng is not None else random.Random(seed)
         self.CNT_PLAYERS = 4
         self.CNT_STEPS = 64
         self.CNT_BALLS = 4
@@ -131,21 +344,34 @@ class Dog(Game):
             2: 32,
             3: 48
         }
-        
-        self._state = None
+
+        # Compact marble representation used for all rule evaluation:
+        # slot = idx_player * CNT_BALLS + idx_marble, each board cell holds a bitmask of the slots on it
+        self.CNT_FIELDS = 96
+        self._marble_pos: List[int] = []
+        self._board: List[int] = []
+        self._save_mask = 0
+        self._marbles_dirty = False
+
+        # Undo log of the running SEVEN sequence (None if no sequence is running)
+        self._undo_log: Optional[List[UndoRecord]] = None
+
+        # Undo frames of the applied actions for undo_action (newest last)
+        self.MAX_UNDO_DEPTH = 1000
+        self._undo_stack: Deque[UndoFrame] = deque(maxlen=self.MAX_UNDO_DEPTH)
+
+        self._state: GameState
         self.reset()
 
     def reset(self) -> None:
         """Reset the game state."""
-        # Create exactly 110 cards (2 decks of 55 cards each)
-        all_cards = []
-        for _ in range(2):  # Two decks
-            for card in GameState.LIST_CARD:
-                all_cards.append(copy.deepcopy(card))
+        # Shuffle the ids of exactly 110 cards (2 decks of 55 cards each)
+        deck = list(DECK_CARD_IDS)
         
         # Verify we have exactly 110 cards
-        assert len(all_cards) == 110, f"Deck initialization error: got {len(all_cards)} cards instead of 110"
-        random.shuffle(all_cards)
+        assert len(deck) == 110, f"Deck initialization error: got {len(deck)} cards instead of 110"
+        self._rng.shuffle(deck)
+        all_cards = [CARD_BY_ID[card_id] for card_id in deck]
         
         # Always start with 6 cards per player in initial state
         cards_per_player = 6
@@ -176,6 +402,9 @@ class Dog(Game):
             seven_backup_state=None,
             seven_player_idx=None
         )
+        self._load_marbles()
+        self._undo_log = None
+        self._undo_stack.clear()
 
         # Validate total card count
         total_cards = len(self._state.list_card_draw)
@@ -184,8 +413,140 @@ class Dog(Game):
         
         assert total_cards == 110, f"Total card count error: {total_cards} cards instead of 110"
 
+    # Compact Marble Representation
+    def _load_marbles(self) -> None:
+        """Build the marble position array, board occupancy and save mask from the game state."""
+        self._marble_pos = [0] * (self.CNT_PLAYERS * self.CNT_BALLS)
+        self._board = [0] * self.CNT_FIELDS
+        self._save_mask = 0
+        self._marbles_dirty = False
+        for idx_player, player in enumerate(self._state.list_player):
+            for idx_marble, marble in enumerate(player.list_marble):
+                slot = idx_player * self.CNT_BALLS + idx_marble
+                self._marble_pos[slot] = marble.pos
+                self._board[marble.pos] |= 1 << slot
+                if marble.is_save:
+                    self._save_mask |= 1 << slot
+
+    def _store_marbles(self) -> None:
+        """Write the marble position array and save mask back into the game state."""
+        if not self._marbles_dirty:
+            return
+        for idx_player, player in enumerate(self._state.list_player):
+            for idx_marble, marble in enumerate(player.list_marble):
+                slot = idx_player * self.CNT_BALLS + idx_marble
+                marble.pos = self._marble_pos[slot]
+                marble.is_save = bool(self._save_mask >> slot & 1)
+        self._marbles_dirty = False
+
+    def _move_slot(self, slot: int, pos_to: int, is_save: Optional[bool] = None) -> None:
+        """Move the marble in the given slot and keep board occupancy and save mask in sync."""
+        if self._undo_log is not None:
+            self._undo_log.append(UndoRecord('marble', slot, self._marble_pos[slot], self._is_slot_save(slot)))
+        bit = 1 << slot
+        self._board[self._marble_pos[slot]] &= ~bit
+        self._board[pos_to] |= bit
+        self._marble_pos[slot] = pos_to
+        if is_save is not None:
+            if is_save:
+                self._save_mask |= bit
+            else:
+                self._save_mask &= ~bit
+        self._marbles_dirty = True
+
+    def _remove_card(self, idx_player: int, card: Card) -> None:
+        """Remove a card from a player's hand and record it in the undo log."""
+        list_card = self._state.list_player[idx_player].list_card
+        idx_card = list_card.index(card)
+        del list_card[idx_card]
+        if self._undo_log is not None:
+            self._undo_log.append(UndoRecord('card', idx_player, idx_card, card=card))
+
+    def _rollback(self) -> None:
+        """Revert all changes recorded in the undo log, newest first."""
+        undo_log, self._undo_log = self._undo_log or [], None
+        for record in reversed(undo_log):
+            if record.kind == 'marble':
+                self._move_slot(record.idx, record.pos, record.is_save)
+            elif record.card is not None:
+                self._state.list_player[record.idx].list_card.insert(record.pos, record.card)
+
+    def _is_slot_save(self, slot: int) -> bool:
+        """Check if the marble in the given slot is save."""
+        return bool(self._save_mask >> slot & 1)
+
+    def _player_mask(self, idx_player: int) -> int:
+        """Return the slot bitmask of all marbles of a player."""
+        return ((1 << self.CNT_BALLS) - 1) << (idx_player * self.CNT_BALLS)
+
+    def _player_slots(self, idx_player: int) -> range:
+        """Return the slots of all marbles of a player."""
+        return range(idx_player * self.CNT_BALLS, (idx_player + 1) * self.CNT_BALLS)
+
+    @staticmethod
+    def _first_slot(mask: int) -> int:
+        """Return the lowest slot in a slot bitmask (-1 if empty)."""
+        return (mask & -mask).bit_length() - 1
+
+    @staticmethod
+    def _last_slot(mask: int) -> int:
+        """Return the highest slot in a slot bitmask (-1 if empty)."""
+        return mask.bit_length() - 1
+
+    def _iter_slots(self, mask: int) -> List[int]:
+        """Return all slots in a slot bitmask in ascending order."""
+        slots = []
+        while mask:
+            low = mask & -mask
+            slots.append(low.bit_length() - 1)
+            mask ^= low
+        return slots
+
 
     def apply_action(self, action: Optional[Action]) -> None:
+        """Apply the given action to the game and remember how to undo it."""
+        frame = self._make_undo_frame()
+        self._apply_action(action)
+        self._undo_stack.append(frame)
+
+    def undo_action(self) -> None:
+        """Undo the last applied action."""
+        if not self._undo_stack:
+            raise ValueError("There is no action to undo.")
+        self._restore_undo_frame(self._undo_stack.pop())
+
+    def _make_undo_frame(self) -> UndoFrame:
+        """Capture the parts of the state apply_action can change."""
+        state = self._state
+        return UndoFrame(
+            state=state,
+            fields={name: getattr(state, name) for name in self.UNDO_FIELDS},
+            list_hand=[list(player.list_card) for player in state.list_player],
+            list_card_draw=list(state.list_card_draw),
+            list_card_discard=list(state.list_card_discard),
+            marble_pos=list(self._marble_pos),
+            save_mask=self._save_mask,
+            undo_log=None if self._undo_log is None else list(self._undo_log)
+        )
+
+    def _restore_undo_frame(self, frame: UndoFrame) -> None:
+        """Restore the state captured by _make_undo_frame."""
+        self._state = state = frame.state
+        for name, value in frame.fields.items():
+            setattr(state, name, value)
+        for player, list_card in zip(state.list_player, frame.list_hand):
+            player.list_card = list(list_card)
+        state.list_card_draw = list(frame.list_card_draw)
+        state.list_card_discard = list(frame.list_card_discard)
+        self._marble_pos = list(frame.marble_pos)
+        self._board = [0] * self.CNT_FIELDS
+        for slot, pos in enumerate(self._marble_pos):
+            self._board[pos] |= 1 << slot
+        self._save_mask = frame.save_mask
+        self._marbles_dirty = True
+        self._undo_log = None if frame.undo_log is None else list(frame.undo_log)
+
+    def _apply_action(self, action: Optional[Action]) -> None:
         state = self._state
 
         def validate_total_cards():
@@ -211,7 +572,7 @@ class Dog(Game):
                     if len(state.list_card_draw) == 0 and len(state.list_card_discard) > 0:
                         state.list_card_draw = state.list_card_discard[:]
                         state.list_card_discard = []
-                        random.shuffle(state.list_card_draw)
+                        self._rng.shuffle(state.list_card_draw)
                     
                     # Draw cards
                     while len(active_player.list_card) < 6 and len(state.list_card_draw) > 0:
@@ -237,9 +598,12 @@ class Dog(Game):
 
             # Handle SEVEN card passing
             if state.card_active and state.card_active.rank == '7':
-                if state.seven_backup_state:
-                    self._state = copy.deepcopy(state.seven_backup_state)
+                if self._undo_log is not None:
+                    self._rollback()
+                elif state.seven_backup_state:
+                    self._state = state.seven_backup_state.clone()
                     state = self._state
+                    self._load_marbles()
                 state.card_active = None
                 state.seven_steps_remaining = None
                 state.seven_backup_state = None
@@ -276,6 +640,7 @@ class Dog(Game):
 
         # Handle regular moves
         player = state.list_player[state.idx_player_active]
+        idx_active = state.idx_player_active
         
         # Move marble
         if action.pos_from is not None and action.pos_to is not None:
@@ -283,11 +648,9 @@ class Dog(Game):
                 self._handle_marble_capture(action.pos_to)
                 
                 # Move marble out of kennel
-                for marble in player.list_marble:
-                    if marble.pos == action.pos_from:
-                        marble.pos = action.pos_to
-                        marble.is_save = True if action.pos_to % 16 == 0 else False
-                        break
+                slot = self._first_slot(self._board[action.pos_from] & self._player_mask(idx_active))
+                if slot >= 0:
+                    self._move_slot(slot, action.pos_to, action.pos_to % 16 == 0)
                         
                 # Remove the used card
                 if state.card_active is None:
@@ -302,12 +665,14 @@ class Dog(Game):
             # Handle SEVEN card
             if action.card.rank == '7':
                 if state.card_active is None:
-                    # Starting new SEVEN sequence
+                    # Starting new SEVEN sequence: the undo log rolls back this instance, the backup
+                    # state keeps the sequence revertible after get_state/set_state
+                    state.seven_backup_state = self._copy_game_state()
                     state.card_active = action.card
                     state.seven_steps_remaining = 7
-                    state.seven_backup_state = copy.deepcopy(state)
+                    self._undo_log = []
                     state.seven_player_idx = state.idx_player_active
-                    player.list_card.remove(action.card)
+                    self._remove_card(idx_active, action.card)
                 
                 # Calculate steps used
                 if self.is_finish_field(action.pos_to):
@@ -315,8 +680,6 @@ class Dog(Game):
                         steps_used = action.pos_to - action.pos_from
                     else:
                         # Moving into finish area
-                        finish_entry = state.idx_player_active * 16
-                        steps_to_entry = (finish_entry - action.pos_from + 1) % 64
                         steps_used = 5  # Fixed cost for entering finish
                 else:
                     steps_used = (action.pos_to - action.pos_from) % 64
@@ -324,31 +687,26 @@ class Dog(Game):
                 # Check if move is valid
                 if steps_used <= state.seven_steps_remaining:
                     # Move the marble first
-                    for marble in player.list_marble:
-                        if marble.pos == action.pos_from:
-                            # Handle captures before moving
-                            if not self.is_finish_field(action.pos_from):
-                                for pos in range(action.pos_from + 1, action.pos_to + 1):
-                                    check_pos = pos % 64
-                                    for p in state.list_player:
-                                        for other_marble in p.list_marble:
-                                            if other_marble.pos == check_pos and not other_marble.is_save:
-                                                # Send marble back to kennel
-                                                player_idx = state.list_player.index(p)
-                                                kennel_base = 64 + (player_idx * 8)
-                                                for kennel_pos in range(kennel_base, kennel_base + 4):
-                                                    if all(m.pos != kennel_pos for m in p.list_marble):
-                                                        other_marble.pos = kennel_pos
-                                                        other_marble.is_save = False
-                                                        break
-                            
-                            # Move the marble
-                            marble.pos = action.pos_to
-                            if self.is_finish_field(action.pos_to):
-                                marble.is_save = True
-                            else:
-                                marble.is_save = True if action.pos_to % 16 == 0 else False
-                            break
+                    slot = self._first_slot(self._board[action.pos_from] & self._player_mask(idx_active))
+                    if slot >= 0:
+                        # Handle captures before moving
+                        if not self.is_finish_field(action.pos_from):
+                            for pos in range(action.pos_from + 1, action.pos_to + 1):
+                                check_pos = pos % 64
+                                for other_slot in self._iter_slots(self._board[check_pos] & ~self._save_mask):
+                                    # Send marble back to kennel
+                                    player_idx = other_slot // self.CNT_BALLS
+                                    kennel_base = 64 + (player_idx * 8)
+                                    for kennel_pos in range(kennel_base, kennel_base + 4):
+                                        if not self._board[kennel_pos] & self._player_mask(player_idx):
+                                            self._move_slot(other_slot, kennel_pos, False)
+                                            break
+
+                        # Move the marble
+                        if self.is_finish_field(action.pos_to):
+                            self._move_slot(slot, action.pos_to, True)
+                        else:
+                            self._move_slot(slot, action.pos_to, action.pos_to % 16 == 0)
                     
                     # Update remaining steps
                     state.seven_steps_remaining -= steps_used
@@ -362,6 +720,7 @@ class Dog(Game):
                         state.seven_steps_remaining = None
                         state.seven_backup_state = None
                         state.seven_player_idx = None
+                        self._undo_log = None
                         state.idx_player_active = (state.idx_player_active + 1) % state.cnt_player
                                                
             else:
@@ -372,40 +731,31 @@ class Dog(Game):
                 
                 # Handle Jack swaps
                 if action.card.rank == 'J':
-                    marble_from = None
-                    marble_to = None
+                    slot_from = self._last_slot(self._board[action.pos_from])
+                    slot_to = -1
+                    if action.pos_to != action.pos_from:
+                        slot_to = self._last_slot(self._board[action.pos_to])
                     
-                    for p in state.list_player:
-                        for m in p.list_marble:
-                            if m.pos == action.pos_from:
-                                marble_from = m
-                            elif m.pos == action.pos_to:
-                                marble_to = m
-                    
-                    if marble_from and marble_to:
-                        marble_from.pos, marble_to.pos = marble_to.pos, marble_from.pos
+                    if slot_from >= 0 and slot_to >= 0:
+                        self._move_slot(slot_from, action.pos_to)
+                        self._move_slot(slot_to, action.pos_from)
                 else:
                     # Regular move
                     # First check for and handle captures at destination
-                    for p in state.list_player:
-                        if p != player:  # Don't capture own marbles
-                            for marble in p.list_marble:
-                                if marble.pos == action.pos_to and not marble.is_save:
-                                    # Send marble back to kennel
-                                    player_idx = state.list_player.index(p)
-                                    kennel_base = 64 + (player_idx * 4)
-                                    for kennel_pos in range(kennel_base, kennel_base + 4):
-                                        if all(m.pos != kennel_pos for m in p.list_marble):
-                                            marble.pos = kennel_pos
-                                            marble.is_save = False
-                                            break
+                    own_mask = self._player_mask(idx_active)
+                    for other_slot in self._iter_slots(self._board[action.pos_to] & ~self._save_mask & ~own_mask):
+                        # Send marble back to kennel
+                        player_idx = other_slot // self.CNT_BALLS
+                        kennel_base = 64 + (player_idx * 4)
+                        for kennel_pos in range(kennel_base, kennel_base + 4):
+                            if not self._board[kennel_pos] & self._player_mask(player_idx):
+                                self._move_slot(other_slot, kennel_pos, False)
+                                break
                     
                     # Then move the active marble
-                    for marble in player.list_marble:
-                        if marble.pos == action.pos_from:
-                            marble.pos = action.pos_to
-                            marble.is_save = True if action.pos_to % 16 == 0 else False
-                            break
+                    slot = self._first_slot(self._board[action.pos_from] & own_mask)
+                    if slot >= 0:
+                        self._move_slot(slot, action.pos_to, action.pos_to % 16 == 0)
                 
                 # Move to next player
                 state.card_active = None
@@ -416,15 +766,13 @@ class Dog(Game):
         state.cnt_round += 1
         state.bool_card_exchanged = False
         
-        # Create a fresh deck of 110 cards
-        all_cards = []
-        for _ in range(2):  # Two decks
-            for card in GameState.LIST_CARD:
-                all_cards.append(copy.deepcopy(card))
+        # Shuffle the ids of exactly 110 cards (2 decks of 55 cards each)
+        deck = list(DECK_CARD_IDS)
         
         # Verify we have exactly 110 cards
-        assert len(all_cards) == 110, f"Deck initialization error: got {len(all_cards)} cards instead of 110"
-        random.shuffle(all_cards)
+        assert len(deck) == 110, f"Deck initialization error: got {len(deck)} cards instead of 110"
+        self._rng.shuffle(deck)
+        all_cards = [CARD_BY_ID[card_id] for card_id in deck]
         
         # Clear all player hands
         for player in state.list_player:
@@ -449,6 +797,7 @@ class Dog(Game):
         state.seven_steps_remaining = None
         state.seven_backup_state = None
         state.seven_player_idx = None
+        self._undo_log = None
         
         # Update starting player
         state.idx_player_started = (state.idx_player_started + 1) % state.cnt_player
@@ -464,7 +813,6 @@ class Dog(Game):
     def _handle_marble_capture(self, pos_to: int, pos_from: Optional[int] = None) -> None:
         """Send marbles at pos_to back to their kennels."""
         state = self._state
-        active_player = state.list_player[state.idx_player_active]
 
         # For Seven card, check all positions in the path
         if state.card_active and state.card_active.rank == '7' and pos_from is not None:
@@ -474,48 +822,21 @@ class Dog(Game):
             # Check each position in the path
             for pos in range(start_pos + 1, end_pos + 1):
                 pos = pos % 64  # Wrap around board
-                for player in state.list_player:
-                    for marble in player.list_marble:
-                        if marble.pos == pos and not marble.is_save:
-                            # Send marble back to kennel
-                            marble.pos = 64 + (8 * state.list_player.index(player))
+                for slot in self._iter_slots(self._board[pos] & ~self._save_mask):
+                    # Send marble back to kennel
+                    self._move_slot(slot, 64 + (8 * (slot // self.CNT_BALLS)))
         else:
             # Regular capture at destination
-            for player in state.list_player:
-                for marble in player.list_marble:
-                    if marble.pos == pos_to and not marble.is_save:
-                        marble.pos = 64 + (8 * state.list_player.index(player))
+            for slot in self._iter_slots(self._board[pos_to] & ~self._save_mask):
+                self._move_slot(slot, 64 + (8 * (slot // self.CNT_BALLS)))
 
     def _copy_game_state(self) -> GameState:
-        """Create a deep copy of the current game state."""
-        state = self._state
-        return GameState(
-            cnt_player=state.cnt_player,
-            phase=state.phase,
-            cnt_round=state.cnt_round,
-            bool_game_finished=state.bool_game_finished,
-            bool_card_exchanged=state.bool_card_exchanged,
-            idx_player_started=state.idx_player_started,
-            idx_player_active=state.idx_player_active,
-            list_player=[
-                PlayerState(
-                    name=p.name,
-                    list_card=p.list_card.copy(),
-                    list_marble=[
-                        Marble(pos=m.pos, is_save=m.is_save)
-                        for m in p.list_marble
-                    ]
-                )
-                for p in state.list_player
-            ],
-            list_card_draw=state.list_card_draw.copy(),
-            list_card_discard=state.list_card_discard.copy(),
-            card_active=state.card_active,
-            seven_steps_remaining=state.seven_steps_remaining,
-            seven_backup_state=None,  # Don't copy backup state
-            seven_player_idx=state.seven_player_idx
-        )        
-    
+        """Create a copy of the current game state."""
+        self._store_marbles()
+        state = self._state.clone()
+        state.seven_backup_state = None  # Don't copy backup state
+        return state
+
     def _handle_card_exchange(self, card: Card) -> None:
         """Handle card exchange between partners."""
         state = self._state
@@ -545,14 +866,19 @@ class Dog(Game):
 
     def get_state(self) -> GameState:
         """Return the current game state."""
+        self._store_marbles()
         return self._state
 
     def set_state(self, state: GameState) -> None:
         """Set the game state to a new state."""
         self._state = state
+        self._load_marbles()
+        self._undo_log = None
+        self._undo_stack.clear()
 
     def print_state(self) -> None:
         """Print the current game state."""
+        self._store_marbles()
         logging.info(self._state)
 
     # Round Management Methods
@@ -566,8 +892,8 @@ class Dog(Game):
             player.list_card = []
         
         cards_per_player = self.get_cards_per_round(self._state.cnt_round)
-        all_cards = GameState.LIST_CARD.copy()
-        random.shuffle(all_cards)
+        all_cards = [CARD_BY_ID[card_id] for card_id in DECK_CARD_IDS[:len(GameState.LIST_CARD)]]
+        self._rng.shuffle(all_cards)
         
         for i in range(4):
             start_idx = i * cards_per_player
@@ -594,7 +920,7 @@ class Dog(Game):
         if not state.list_card_draw and state.list_card_discard:
             state.list_card_draw.extend(state.list_card_discard)
             state.list_card_discard = []
-            random.shuffle(state.list_card_draw)
+            self._rng.shuffle(state.list_card_draw)
 
     def deal_cards(self):
         """Deal cards to players based on round number"""
@@ -607,13 +933,20 @@ class Dog(Game):
                     player.list_card.append(self._state.list_card_draw.pop(0))
 
     # Position and Movement Methods
+    def get_marble_at(self, position: int) -> Optional[Tuple[int, int]]:
+        """Return (idx_player, idx_marble) of the marble on a given position, using the occupancy index."""
+        if not 0 <= position < self.CNT_FIELDS or not self._board[position]:
+            return None
+        return divmod(self._first_slot(self._board[position]), self.CNT_BALLS)
+
+    def is_pos_occupied(self, position: int) -> bool:
+        """Check if any marble is on a given position."""
+        return 0 <= position < self.CNT_FIELDS and self._board[position] != 0
+
     def get_player_who_occupies_pos(self, position: int) -> Optional[int]:
         """Return the index of the player who occupies a given position."""
-        for i, p in enumerate(self._state.list_player):
-            for m in p.list_marble:
-                if m.pos == position:
-                    return i
-        return None
+        occupant = self.get_marble_at(position)
+        return None if occupant is None else occupant[0]
 
     def is_finish_field(self, pos: int) -> bool:
         """Check if a given position is in the finish area."""
@@ -625,24 +958,20 @@ class Dog(Game):
             return False
 
         for pos in range(pos_from + 1, pos_to):
-            occupant_idx = self.get_player_who_occupies_pos(pos)
-            if occupant_idx is not None:
-                for player in self._state.list_player:
-                    for marble in player.list_marble:
-                        if marble.pos == pos:
-                            return False
+            if self.is_pos_occupied(pos):
+                return False
         return True
 
     def is_path_to_finish_clear(self, pos_from: int, pos_to: int) -> bool:
         """Check if the path to finish is clear."""
         if pos_from < 64:
             for pos in range(pos_from + 1, 64):
-                if self.get_player_who_occupies_pos(pos) is not None:
+                if self.is_pos_occupied(pos):
                     return False
         
         if self.is_finish_field(pos_to):
             for pos in range(72, pos_to):
-                if self.get_player_who_occupies_pos(pos) is not None:
+                if self.is_pos_occupied(pos):
                     return False
         
         return True
@@ -723,111 +1052,120 @@ class Dog(Game):
             list_card_discard=[],
             card_active=None
         )
+        self._load_marbles()
+        self._undo_log = None
+        self._undo_stack.clear()
                 
     def check_game_finished(self) -> bool:
         """Check if any team has finished the game."""
+        return self.get_winning_team() is not None
+
+    def get_winning_team(self) -> Optional[int]:
+        """Return the team (0: players 0 and 2, 1: players 1 and 3) that has finished the game, if any."""
         # Check each team (players across from each other)
         for team_start in [0, 1]:
             team_finished = True
             # Check both players in the team
             for player_idx in [team_start, (team_start + 2) % 4]:
-                player = self._state.list_player[player_idx]
                 # Check if all marbles are in finish area
-                for marble in player.list_marble:
-                    if marble.pos < 72 or marble.pos >= 80:  # Not in finish area
+                for slot in self._player_slots(player_idx):
+                    if self._marble_pos[slot] < 72 or self._marble_pos[slot] >= 80:  # Not in finish area
                         team_finished = False
                         break
                 if not team_finished:
                     break
             if team_finished:
-                return True
-        return False
+                return team_start
+        return None
     
     def get_list_action(self) -> List[Action]:
         """Return a list of possible actions for the active player."""
+        return list(self.iter_actions())
+
+    def has_any_action(self) -> bool:
+        """Check if the active player has at least one possible action."""
+        return next(self.iter_actions(), None) is not None
+
+    def count_actions(self) -> int:
+        """Return the number of possible actions for the active player."""
+        return sum(1 for _ in self.iter_actions())
+
+    def _is_path_blocked(self, path: Optional[Tuple[int, ...]]) -> bool:
+        """Check if path is blocked by any saved marbles."""
+        if path is None:
+            return True
+        board = self._board
+        for pos in path:
+            occupant = self.get_marble_at(pos)
+            if occupant is not None and board[pos] & self._save_mask & self._player_mask(occupant[0]):
+                return True
+        return False
+
+    def iter_actions(self) -> Iterator[Action]:
+        """Yield the possible actions for the active player (in the order of get_list_action).
+
+        Actions are generated lazily, so the game must not be changed while iterating.
+        """
         state = self._state
-        actions = []
         active_player_idx = state.idx_player_active
         player = state.list_player[active_player_idx]
 
-        # Define move options
-        move_options = {
-            'A': [1, 11],
-            '2': [2],
-            '3': [3],
-            '4': [4, -4],
-            '5': [5],
-            '6': [6],
-            '7': [1, 2, 3, 4, 5, 6, 7],
-            '8': [8],
-            '9': [9],
-            '10': [10],
-            'Q': [12],
-            'K': [13],
-            'JKR': []  
-        }
-
-        def is_path_blocked(pos_from: int, pos_to: int) -> bool:
-            """Check if path is blocked by any saved marbles."""
-            if pos_from >= pos_to:
-                return True
-            for pos in range(pos_from + 1, pos_to + 1):
-                pos_check = pos % 64
-                occupant = self.get_player_who_occupies_pos(pos_check)
-                if occupant is not None:
-                    for m in state.list_player[occupant].list_marble:
-                        if m.pos == pos_check and m.is_save:
-                            return True
-            return False
+        board = self._board
+        marble_pos = self._marble_pos
+        is_path_blocked = self._is_path_blocked
 
         # Card exchange at beginning of round
         if not state.bool_card_exchanged:
+            seen_card: set = set()
             for card in player.list_card:
-                action = Action(card=card, pos_from=None, pos_to=None)
-                if action not in actions:
-                    actions.append(action)
-            return actions
+                if card not in seen_card:
+                    seen_card.add(card)
+                    yield Action(card=card, pos_from=None, pos_to=None)
+            return
 
         # Check if all marbles are in finish
         all_marbles_in_finish = True
-        for marble in player.list_marble:
-            if not self.is_finish_field(marble.pos):
+        for slot in self._player_slots(active_player_idx):
+            if not self.is_finish_field(marble_pos[slot]):
                 all_marbles_in_finish = False
                 break
 
         # If all marbles are in finish, allow moving partner's marbles
         if all_marbles_in_finish:
             partner_idx = (active_player_idx + 2) % 4
-            partner = state.list_player[partner_idx]
+            found_partner_action = False
             
             for card in player.list_card:
-                if card.rank in move_options:
-                    steps_list = move_options[card.rank]
-                    for marble in partner.list_marble:
-                        if 0 <= marble.pos < 64 and not marble.is_save:
-                            for step in steps_list:
-                                new_pos = (marble.pos + step) % 64
-                                if not is_path_blocked(marble.pos, new_pos):
-                                    actions.append(Action(card=card, pos_from=marble.pos, pos_to=new_pos))
+                if card.rank in MOVE_OPTIONS:
+                    for slot in self._player_slots(partner_idx):
+                        pos = marble_pos[slot]
+                        if 0 <= pos < 64 and not self._is_slot_save(slot):
+                            for target in MOVE_TABLE[(card.rank, pos, active_player_idx)]:
+                                if not target.is_finish and not is_path_blocked(target.path):
+                                    found_partner_action = True
+                                    yield Action(card=card, pos_from=pos, pos_to=target.pos_to)
             
             # Handle Joker cards for partner support
             for card in player.list_card:
                 if card.rank == 'JKR':
-                    for marble in partner.list_marble:
-                        if marble.pos >= 64:  # Marble in kennel
-                            actions.append(Action(card=card, pos_from=marble.pos, pos_to=0))
-                        elif 0 <= marble.pos < 64:  # Marble on board
+                    for slot in self._player_slots(partner_idx):
+                        pos = marble_pos[slot]
+                        if pos >= 64:  # Marble in kennel
+                            found_partner_action = True
+                            yield Action(card=card, pos_from=pos, pos_to=0)
+                        elif 0 <= pos < 64:  # Marble on board
+                            found_partner_action = True
                             for suit in ['♠', '♥', '♦', '♣']:
-                                actions.append(Action(card=card, pos_from=None, pos_to=None, card_swap=Card(suit=suit, rank='A')))
-                                actions.append(Action(card=card, pos_from=None, pos_to=None, card_swap=Card(suit=suit, rank='K')))
+                                yield Action(card=card, pos_from=None, pos_to=None, card_swap=get_card(suit, 'A'))
+                                yield Action(card=card, pos_from=None, pos_to=None, card_swap=get_card(suit, 'K'))
 
-            if actions:  
-                return actions
+            if found_partner_action:
+                return
 
         # Special handling for seven card moves
         if state.card_active and state.card_active.rank == '7' and state.seven_steps_remaining is not None:
-            for marble in player.list_marble:
-                pos_from = marble.pos
+            for slot in self._player_slots(active_player_idx):
+                pos_from = marble_pos[slot]
                 
                 # Handle moves in finish area
                 if self.is_finish_field(pos_from):
@@ -839,109 +1177,102 @@ class Dog(Game):
                     for steps in range(1, max_steps + 1):
                         pos_to = pos_from + steps
                         if pos_to <= 79:  
-                            actions.append(Action(
+                            yield Action(
                                 card=state.card_active,
                                 pos_from=pos_from,
                                 pos_to=pos_to
-                            ))
-                else:
+                            )
+                elif pos_from < 64:
                     # Regular board moves
-                    for steps in range(1, state.seven_steps_remaining + 1):
+                    for target in MOVE_TABLE[('7', pos_from, active_player_idx)]:
+                        steps = target.step
+                        if target.is_finish or steps > state.seven_steps_remaining:
+                            continue
+
                         # Try regular move on board
-                        pos_to = (pos_from + steps) % 64
-                        if not is_path_blocked(pos_from, pos_to):
-                            actions.append(Action(
+                        if not is_path_blocked(target.path):
+                            yield Action(
                                 card=state.card_active,
                                 pos_from=pos_from,
-                                pos_to=pos_to
-                            ))
+                                pos_to=target.pos_to
+                            )
                         
                         # Try move to finish area
                         finish_entry = active_player_idx * 16
                         if pos_from <= finish_entry < (pos_from + steps):
-                            # Calculate finish position based on remaining steps
-                            steps_to_entry = (finish_entry - pos_from + 1)
-                            remaining_steps = steps - steps_to_entry
                             finish_pos = 77  # First position in finish area
                             if self.can_move_to_finish(pos_from, finish_pos, active_player_idx):
-                                actions.append(Action(
+                                yield Action(
                                     card=state.card_active,
                                     pos_from=pos_from,
                                     pos_to=finish_pos
-                                ))
+                                )
             
-            return actions
+            return
 
         occupant_player_idx = self.get_player_who_occupies_pos(0)
         start_occupied_by_self = (occupant_player_idx == active_player_idx)
-        has_marble_at_64 = any(m.pos == 64 for m in player.list_marble)
+        has_marble_at_64 = bool(board[64] & self._player_mask(active_player_idx))
 
         # If card_active is set, only produce actions for card_active
         if state.card_active is not None:
             active_card = state.card_active
             # START action if applicable
             if active_card.rank in ['A', 'K', 'JKR'] and not start_occupied_by_self and has_marble_at_64:
-                actions.append(Action(card=active_card, pos_from=64, pos_to=0))
-            # Normal moves if in move_options
-            if active_card.rank in move_options:
-                steps_list = move_options[active_card.rank]
-                for marble in player.list_marble:
-                    if 0 <= marble.pos < 64:
-                        for step in steps_list:
-                            new_pos = (marble.pos + step) % 64
-                            if not is_path_blocked(marble.pos, new_pos):
-                                actions.append(Action(card=active_card, pos_from=marble.pos, pos_to=new_pos))
-            return actions
+                yield Action(card=active_card, pos_from=64, pos_to=0)
+            # Normal moves if in MOVE_OPTIONS
+            if active_card.rank in MOVE_OPTIONS:
+                for slot in self._player_slots(active_player_idx):
+                    pos = marble_pos[slot]
+                    if 0 <= pos < 64:
+                        for target in MOVE_TABLE[(active_card.rank, pos, active_player_idx)]:
+                            if not target.is_finish and not is_path_blocked(target.path):
+                                yield Action(card=active_card, pos_from=pos, pos_to=target.pos_to)
+            return
+
+        yield from self._iter_unique_actions(
+            self._iter_hand_actions(start_occupied_by_self, has_marble_at_64))
+
+    @staticmethod
+    def _iter_unique_actions(actions: Iterator[Action]) -> Iterator[Action]:
+        """Yield each action only once, keeping the first occurrence."""
+        seen: set = set()
+        for action in actions:
+            key: Any = action.get_code()
+            if key < 0:
+                key = action
+            if key not in seen:
+                seen.add(key)
+                yield action
+
+    def _iter_hand_actions(self, start_occupied_by_self: bool, has_marble_at_64: bool) -> Iterator[Action]:
+        """Yield the actions for the cards in the hand of the active player (may contain duplicates)."""
+        state = self._state
+        active_player_idx = state.idx_player_active
+        player = state.list_player[active_player_idx]
+        board = self._board
+        marble_pos = self._marble_pos
+        is_path_blocked = self._is_path_blocked
 
         # START actions (A, K)
         for card in player.list_card:
             if card.rank in ['A', 'K'] and not start_occupied_by_self and has_marble_at_64:
-                # Check for opponents on the start position
-                opponent_on_start = False
-                for p_idx, p in enumerate(state.list_player):
-                    if p_idx != active_player_idx:
-                        for marble in p.list_marble:
-                            if marble.pos == 0 and not marble.is_save:
-                                opponent_on_start = True
-                                break
-                        if opponent_on_start:
-                            break
-
-                # Add start action with or without opponent consideration
-                actions.append(Action(card=card, pos_from=64, pos_to=0))
+                # Add start action with or without opponent on the start position
+                yield Action(card=card, pos_from=64, pos_to=0)
 
         # NORMAL MOVE actions for numeric cards
         for card in player.list_card:
-            if card.rank in move_options:
-                steps_list = move_options[card.rank]
-                for marble in player.list_marble:
-                    if 0 <= marble.pos < 64:  # Marble on main board
-                        for step in steps_list:
-                            # Calculate positions
-                            pos_finish = self.CNT_STEPS + active_player_idx * self.CNT_BALLS * 2 + self.CNT_BALLS
-                            pos_start = active_player_idx * int(self.CNT_STEPS / self.CNT_PLAYERS)
-                            
-                            # Try regular board moves
-                            new_pos = (marble.pos + step) % 64
-                            if not is_path_blocked(marble.pos, new_pos):
-                                actions.append(Action(card=card, pos_from=marble.pos, pos_to=new_pos))
-                            
-                            # Try finish moves for each possible finish position
-                            for i in range(4):
-                                pos_to = pos_finish + i
-                                
-                                # Calculate required starting position using test logic
-                                if pos_to - step < pos_finish:
-                                    pos_from = (pos_start - step + (pos_to - pos_finish + 1) + self.CNT_STEPS) % self.CNT_STEPS
-                                else:
-                                    pos_from = pos_to - step
-                                    
-                                # If marble is in the calculated starting position, add finish move
-                                if marble.pos == pos_from:
-                                    # Check if finish position is empty
-                                    if all(not any(m.pos == pos_to for m in p.list_marble) 
-                                        for p in state.list_player):
-                                        actions.append(Action(card=card, pos_from=pos_from, pos_to=pos_to))
+            if card.rank in MOVE_OPTIONS:
+                for slot in self._player_slots(active_player_idx):
+                    marble_from = marble_pos[slot]
+                    if 0 <= marble_from < 64:  # Marble on main board
+                        for target in MOVE_TABLE[(card.rank, marble_from, active_player_idx)]:
+                            if target.is_finish:
+                                # Finish move only needs an empty finish position
+                                if not board[target.pos_to]:
+                                    yield Action(card=card, pos_from=marble_from, pos_to=target.pos_to)
+                            elif not is_path_blocked(target.path):
+                                yield Action(card=card, pos_from=marble_from, pos_to=target.pos_to)
                                 
         # Joker transformations
         jokers = [c for c in player.list_card if c.rank == 'JKR']
@@ -952,32 +1283,32 @@ class Dog(Game):
             if state.card_active is None:
                 # Check if we have any marbles in kennel
                 if has_marble_at_64:
-                    actions.append(Action(card=joker_card, pos_from=64, pos_to=0))
+                    yield Action(card=joker_card, pos_from=64, pos_to=0)
                 
                 # If marble in kennel, only allow A and K transformations
                 if has_marble_at_64:
                     for suit in suits:
                         for rank in ['A', 'K']:
-                            actions.append(Action(
+                            yield Action(
                                 card=joker_card,
                                 pos_from=None,
                                 pos_to=None,
-                                card_swap=Card(suit=suit, rank=rank)
-                            ))
+                                card_swap=get_card(suit, rank)
+                            )
                 else:
                     # In later game, allow transformation to any card
                     ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
                     for suit in suits:
                         for rank in ranks:
-                            actions.append(Action(
+                            yield Action(
                                 card=joker_card,
                                 pos_from=None,
                                 pos_to=None,
-                                card_swap=Card(suit=suit, rank=rank)
-                            ))
+                                card_swap=get_card(suit, rank)
+                            )
             elif state.card_active.rank == 'JKR':
                 if has_marble_at_64:
-                    actions.append(Action(card=joker_card, pos_from=64, pos_to=0))
+                    yield Action(card=joker_card, pos_from=64, pos_to=0)
                     
         # J (Jack) card swap actions
         for card in player.list_card:
@@ -987,45 +1318,28 @@ class Dog(Game):
                 opponent_marbles = []
                 
                 # Collect marble positions
-                for p_idx, p in enumerate(state.list_player):
-                    for marble in p.list_marble:
-                        if 0 <= marble.pos < 64: 
-                            if p_idx == active_player_idx:
-                                our_marbles.append(marble.pos)  
-                            elif not marble.is_save:  
-                                opponent_marbles.append(marble.pos)
+                for slot, pos in enumerate(marble_pos):
+                    if 0 <= pos < 64: 
+                        if slot // self.CNT_BALLS == active_player_idx:
+                            our_marbles.append(pos)  
+                        elif not self._is_slot_save(slot):  
+                            opponent_marbles.append(pos)
 
                 # If there are opponent marbles available, generate swaps with them
                 if opponent_marbles:
                     # Generate swaps between our marbles and opponent marbles
                     for our_pos in our_marbles:
                         for opp_pos in opponent_marbles:
-                            actions.append(Action(card=card, pos_from=our_pos, pos_to=opp_pos))
-                            actions.append(Action(card=card, pos_from=opp_pos, pos_to=our_pos))
+                            yield Action(card=card, pos_from=our_pos, pos_to=opp_pos)
+                            yield Action(card=card, pos_from=opp_pos, pos_to=our_pos)
                 else:
                     # If no opponent swaps available, allow swaps between our own marbles
                     if len(our_marbles) >= 2:
                         for i, pos1 in enumerate(our_marbles):
                             for pos2 in our_marbles[i+1:]:
-                                actions.append(Action(card=card, pos_from=pos1, pos_to=pos2))
-                                actions.append(Action(card=card, pos_from=pos2, pos_to=pos1))
-                                                      
-        # Remove duplicates
-        unique_actions = []
-        seen = set()
-        for action in actions:
-            action_tuple = (
-                str(action.card),
-                action.pos_from,
-                action.pos_to,
-                str(action.card_swap) if action.card_swap else None
-            )
-            if action_tuple not in seen:
-                seen.add(action_tuple)
-                unique_actions.append(action)
+                                yield Action(card=card, pos_from=pos1, pos_to=pos2)
+                                yield Action(card=card, pos_from=pos2, pos_to=pos1)
 
-        return unique_actions
-                                           
     def calculate_steps(self, pos_from: int, pos_to: int) -> int:
         """Calculate number of steps between positions"""
         if pos_from < 64 and pos_to > 71:  # Moving to finish
@@ -1037,29 +1351,19 @@ class Dog(Game):
 
     def move_marble(self, pos_from: int, pos_to: int, player_idx: int) -> None:
         """Move a marble and handle collisions"""
-        state = self._state
-        player = state.list_player[player_idx]
-        
         # Handle marble at destination
         occupant_idx = self.get_player_who_occupies_pos(pos_to)
         if occupant_idx is not None:
-            occupant = state.list_player[occupant_idx]
-            for m in occupant.list_marble:
-                if m.pos == pos_to:
-                    if occupant_idx != player_idx:
-                        m.pos = 72  # Send to kennel
-                    else:
-                        m.pos = 64  # Send to start
-                    m.is_save = False
+            for slot in self._iter_slots(self._board[pos_to] & self._player_mask(occupant_idx)):
+                if occupant_idx != player_idx:
+                    self._move_slot(slot, 72, False)  # Send to kennel
+                else:
+                    self._move_slot(slot, 64, False)  # Send to start
         
         # Move the marble
-        for m in player.list_marble:
-            if m.pos == pos_from:
-                m.pos = pos_to
-                m.is_save = (pos_to == 0)
-                if pos_from == 0:
-                    m.is_save = False
-                break
+        slot = self._first_slot(self._board[pos_from] & self._player_mask(player_idx))
+        if slot >= 0:
+            self._move_slot(slot, pos_to, pos_to == 0 and pos_from != 0)
                 
     def _calculate_new_position(self, pos_from: int, steps: int, player_idx: int) -> int:
         """Calculate new position after moving steps, considering finish area."""
@@ -1103,7 +1407,7 @@ class Dog(Game):
         # If already in finish area
         if self.is_finish_field(pos_from):
             return pos_from < pos_to and all(
-                self.get_player_who_occupies_pos(pos) is None
+                not self.is_pos_occupied(pos)
                 for pos in range(pos_from + 1, pos_to)
             )
         
@@ -1113,19 +1417,24 @@ class Dog(Game):
         # Check if path to finish entry is clear
         for pos in range(pos_from + 1, finish_entry + 1):
             pos_check = pos % 64
-            if self.get_player_who_occupies_pos(pos_check) is not None:
+            if self.is_pos_occupied(pos_check):
                 return False
                 
         # Check if finish area path is clear
         for pos in range(finish_start, pos_to):
-            if self.get_player_who_occupies_pos(pos) is not None:
+            if self.is_pos_occupied(pos):
                 return False
                 
         return True
 
     def get_player_view(self, idx_player: int) -> GameState:
-        """Return the game state from the perspective of a specific player."""
-        return copy.deepcopy(self._state)
+        """Return the game state from the perspective of a specific player.
+
+        The hands of the other players and the draw pile are replaced by their number
+        of cards (cnt_card, cnt_card_draw) and the backup state of a 7 is left out.
+        """
+        self._store_marbles()
+        return self._state.masked(idx_player)
 
     def compute_pos_to_for_7(self, pos_from: int, steps: int) -> Optional[int]:
         """
@@ -1157,38 +1466,32 @@ class Dog(Game):
         if pos_from < 64 and pos_to < 64:
             # Check normal track path
             for pos in range(pos_from + 1, pos_to):
-                if self.get_player_who_occupies_pos(pos) is not None:
+                if self.is_pos_occupied(pos):
                     return False
         elif pos_from < 64 and self.is_finish_field(pos_to):
             # Check path to finish
             for pos in range(pos_from + 1, 64):
-                if self.get_player_who_occupies_pos(pos) is not None:
+                if self.is_pos_occupied(pos):
                     return False
             # Check finish path
             for pos in range(72, pos_to):
-                if self.get_player_who_occupies_pos(pos) is not None:
+                if self.is_pos_occupied(pos):
                     return False
         elif self.is_finish_field(pos_from):
             # Check finish path
             for pos in range(pos_from + 1, pos_to):
-                if self.get_player_who_occupies_pos(pos) is not None:
+                if self.is_pos_occupied(pos):
                     return False
         return True
-    
-
-    def get_joker_actions(self, player: PlayerState) -> List[Action]:
-        """Generate actions for JOKER card."""
-        actions = []
-        for suit in ['♠', '♥', '♦', '♣']:
-            actions.append(Action(card=Card(suit='', rank='JKR'), pos_from=64, pos_to=0))  # Move out of kennel
-            actions.append(Action(card=Card(suit='', rank='JKR'), pos_from=None, pos_to=None, card_swap=Card(suit=suit, rank='A')))
-            actions.append(Action(card=Card(suit='', rank='JKR'), pos_from=None, pos_to=None, card_swap=Card(suit=suit, rank='K')))
-        return actions
 
 class RandomPlayer(Player):
     """Represents a random player who selects actions randomly."""
+    def __init__(self, seed: Optional[int] = None, rng: Optional[random.Random] = None) -> None:
+        """Initialize the player with its own random number generator."""
+        self._rng = rng if rng is not None else random.Random(seed)
+
     def select_action(self, state: GameState, actions: List[Action]) -> Optional[Action]:
         """Select a random action from the list of possible actions."""
         if actions:
-            return random.choice(actions)
+            return self._rng.choice(actions)
         return None
\ No newline at end of file
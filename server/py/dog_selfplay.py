@@ -0,0 +1,189 @@
+"""Headless Dog self-play: play many complete games between bots and report throughput.
+
+Run from the project root (with PYTHONPATH set as described in the README):
+
+    python server/py/dog_selfplay.py --games 200 --processes 4 --seed 0
+
+Every game gets its own seed (seed, seed + 1, ...), which seeds the random number
+generators of the game and of its players, so a run is reproducible independently
+of the number of processes. Player classes are created with a `seed` keyword if they
+accept one, else with an `rng` keyword (a random.Random seeded with the player's seed).
+Players that take neither are created without arguments; their games are only
+reproducible if the players do not draw random numbers.
+"""
+import argparse
+import importlib
+import inspect
+import json
+import multiprocessing
+import random
+import time
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, cast
+
+from server.py.dog import Dog, GamePhase, RandomPlayer
+from server.py.game import Player
+
+PlayerFactory = Callable[..., Player]
+
+OUTCOME_FINISHED = 'finished'
+OUTCOME_MAX_MOVES = 'max_moves'
+OUTCOME_ERROR = 'error'
+
+
+class GameResult(NamedTuple):
+    """Outcome of a single self-play game."""
+    seed: int
+    outcome: str  # OUTCOME_FINISHED, OUTCOME_MAX_MOVES or OUTCOME_ERROR
+    idx_team_winner: Optional[int]
+    cnt_moves: int
+    cnt_rounds: int
+    seconds: float
+    error: Optional[str] = None
+
+
+class SelfPlayStats(NamedTuple):
+    """Aggregated statistics of a self-play run."""
+    cnt_games: int
+    cnt_moves: int
+    seconds: float
+    games_per_sec: float
+    moves_per_sec: float
+    avg_moves_per_game: float
+    outcomes: Dict[str, int]
+    wins_per_team: Dict[int, int]
+    errors: Dict[str, int]
+
+
+def accepts_keyword(player_factory: PlayerFactory, name: str) -> bool:
+    """Check if player_factory can be called with the keyword argument name."""
+    try:
+        parameters = inspect.signature(player_factory).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(parameter.name == name or parameter.kind == inspect.Parameter.VAR_KEYWORD
+               for parameter in parameters)
+
+
+def create_player(player_factory: PlayerFactory, seed: int) -> Player:
+    """Create a player whose random choices are determined by seed (if it takes a seed or rng keyword)."""
+    if accepts_keyword(player_factory, 'seed'):
+        return player_factory(seed=seed)
+    if accepts_keyword(player_factory, 'rng'):
+        return player_factory(rng=random.Random(seed))
+    return player_factory()
+
+
+def play_game(seed: int, player_factory: PlayerFactory = RandomPlayer, max_moves: int = 5000) -> GameResult:
+    """Play one game of Dog between four players created by player_factory (see create_player())."""
+    rng = random.Random(seed)
+    time_start = time.perf_counter()
+    game = Dog(seed=rng.getrandbits(64))
+    cnt_moves = 0
+    outcome = OUTCOME_MAX_MOVES
+    error = None
+    try:
+        list_player = [create_player(player_factory, rng.getrandbits(64)) for _ in range(game.CNT_PLAYERS)]
+        while cnt_moves < max_moves:
+            if game.get_state().phase == GamePhase.FINISHED:
+                outcome = OUTCOME_FINISHED
+                break
+            idx_player_active = game.get_state().idx_player_active
+            list_action = game.get_list_action()
+            action = None
+            if list_action:
+                view = game.get_player_view(idx_player_active)
+                action = list_player[idx_player_active].select_action(view, list_action)
+            game.apply_action(action)
+            cnt_moves += 1
+        else:
+            if game.get_state().phase == GamePhase.FINISHED:
+                outcome = OUTCOME_FINISHED
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        outcome = OUTCOME_ERROR
+        error = f'{type(e).__name__}: {e}'
+    return GameResult(
+        seed=seed,
+        outcome=outcome,
+        idx_team_winner=game.get_winning_team() if outcome == OUTCOME_FINISHED else None,
+        cnt_moves=cnt_moves,
+        cnt_rounds=game.get_state().cnt_round,
+        seconds=time.perf_counter() - time_start,
+        error=error
+    )
+
+
+def _play_game_task(task: Tuple[int, PlayerFactory, int]) -> GameResult:
+    """Unpack a pool task and play the game (module level, so it can be pickled)."""
+    seed, player_factory, max_moves = task
+    return play_game(seed, player_factory, max_moves)
+
+
+def run_self_play(cnt_games: int, seed: int = 0, processes: int = 1,
+                  player_factory: PlayerFactory = RandomPlayer, max_moves: int = 5000) -> List[GameResult]:
+    """Play cnt_games games with the seeds seed, seed + 1, ... and return the results in seed order."""
+    list_task = [(seed + idx_game, player_factory, max_moves) for idx_game in range(cnt_games)]
+    if processes <= 1:
+        return [_play_game_task(task) for task in list_task]
+    chunksize = max(1, cnt_games // (processes * 4))
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(_play_game_task, list_task, chunksize=chunksize)
+
+
+def summarize(list_result: List[GameResult], seconds: float) -> SelfPlayStats:
+    """Aggregate the results of a self-play run that took seconds of wall time."""
+    cnt_games = len(list_result)
+    cnt_moves = sum(result.cnt_moves for result in list_result)
+    seconds = max(seconds, 1e-9)
+    return SelfPlayStats(
+        cnt_games=cnt_games,
+        cnt_moves=cnt_moves,
+        seconds=seconds,
+        games_per_sec=cnt_games / seconds,
+        moves_per_sec=cnt_moves / seconds,
+        avg_moves_per_game=cnt_moves / cnt_games if cnt_games else 0.0,
+        outcomes=dict(Counter(result.outcome for result in list_result)),
+        wins_per_team=dict(Counter(result.idx_team_winner for result in list_result
+                                   if result.idx_team_winner is not None)),
+        errors=dict(Counter(result.error for result in list_result if result.error is not None))
+    )
+
+
+def load_player_factory(name: str) -> PlayerFactory:
+    """Resolve a dotted name like 'server.py.dog.RandomPlayer' to a player class."""
+    module_name, _, attr_name = name.rpartition('.')
+    return cast(PlayerFactory, getattr(importlib.import_module(module_name), attr_name))
+
+
+def main(argv: Optional[List[str]] = None) -> SelfPlayStats:
+    """Parse the command line, run the games and print the statistics."""
+    parser = argparse.ArgumentParser(description='Play Dog games between bots without a browser.')
+    parser.add_argument('--games', type=int, default=100, help='number of games to play')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help='size of the process pool')
+    parser.add_argument('--max-moves', type=int, default=5000, help='moves after which a game is stopped')
+    parser.add_argument('--player', default='server.py.dog.RandomPlayer', help='dotted name of the player class')
+    parser.add_argument('--json', action='store_true', help='print the statistics as JSON')
+    args = parser.parse_args(argv)
+
+    player_factory = load_player_factory(args.player)
+    time_start = time.perf_counter()
+    list_result = run_self_play(args.games, args.seed, args.processes, player_factory, args.max_moves)
+    stats = summarize(list_result, time.perf_counter() - time_start)
+
+    if args.json:
+        print(json.dumps(stats._asdict(), indent=2))
+    else:
+        print(f'Games:    {stats.cnt_games} ({stats.games_per_sec:.2f} games/sec)')
+        print(f'Moves:    {stats.cnt_moves} ({stats.moves_per_sec:.0f} moves/sec, '
+              f'{stats.avg_moves_per_game:.1f} per game)')
+        print(f'Time:     {stats.seconds:.2f} sec')
+        print(f'Outcomes: {stats.outcomes}')
+        print(f'Wins:     {stats.wins_per_team}')
+        for error, cnt in stats.errors.items():
+            print(f'Error:    {cnt}x {error}')
+    return stats
+
+
+if __name__ == '__main__':
+    main()
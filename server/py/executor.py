@@ -0,0 +1,123 @@
+"""Run engine calls (get_list_action, apply_action, ...) outside the asyncio event loop.
+
+A heavy turn (a 7 split into many moves, a joker) takes long enough to delay every
+other websocket on the server if it runs in the event loop. EngineExecutor runs the
+calls in a bounded thread pool instead:
+
+- calls for the same game run one after another, in the order they were made,
+- at most max_pending calls wait for the pool at a time, further callers wait in
+  the event loop (backpressure instead of an unbounded queue),
+- get_metrics() reports the queue depth and the time spent queued and running.
+
+With max_workers=0 the calls run directly in the event loop, as before.
+"""
+import asyncio
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+MAX_WORKERS = 4
+MAX_PENDING = 64
+
+
+class EngineExecutor:
+    """Bounded thread pool for engine calls with per-game serialization and metrics."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pending: int = MAX_PENDING) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool: Optional[ThreadPoolExecutor] = None
+        if max_workers > 0:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='engine')
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._dict_lock: 'weakref.WeakKeyDictionary[Any, asyncio.Lock]' = weakref.WeakKeyDictionary()
+        self._lock_metrics = threading.Lock()
+        self.cnt_waiting = 0  # calls waiting for their game or a free slot
+        self.cnt_queued = 0  # calls submitted to the pool, not started yet
+        self.cnt_running = 0
+        self.cnt_done = 0
+        self.max_depth = 0
+        self.seconds_queued = 0.0
+        self.seconds_running = 0.0
+
+    def _get_lock(self, game: Any) -> asyncio.Lock:
+        lock = self._dict_lock.get(game)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._dict_lock[game] = lock
+        return lock
+
+    def _call(self, time_submit: float, func: Callable[..., Any], args: Any) -> Any:
+        """Run func in a worker thread and update the metrics."""
+        time_start = time.perf_counter()
+        with self._lock_metrics:
+            self.cnt_queued -= 1
+            self.cnt_running += 1
+            self.seconds_queued += time_start - time_submit
+        try:
+            return func(*args)
+        finally:
+            with self._lock_metrics:
+                self.cnt_running -= 1
+                self.cnt_done += 1
+                self.seconds_running += time.perf_counter() - time_start
+
+    async def run(self, game: Any, func: Callable[..., Any], *args: Any) -> Any:
+        """Call func(*args) for game and return its result, after the earlier calls for game."""
+        if self._pool is None:
+            with self._lock_metrics:
+                self.cnt_done += 1
+            return func(*args)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        with self._lock_metrics:
+            self.cnt_waiting += 1
+        is_waiting = True
+        try:
+            async with self._get_lock(game):
+                async with self._semaphore:
+                    with self._lock_metrics:
+                        self.cnt_waiting -= 1
+                        is_waiting = False
+                        self.cnt_queued += 1
+                        self.max_depth = max(self.max_depth, self.cnt_waiting + self.cnt_queued)
+                    loop = asyncio.get_running_loop()
+                    future = loop.run_in_executor(self._pool, self._call, time.perf_counter(), func, args)
+                    try:
+                        return await asyncio.shield(future)
+                    except asyncio.CancelledError:
+                        # keep the game locked until the worker is done with it
+                        await asyncio.wait([future])
+                        raise
+        finally:
+            if is_waiting:
+                # cancelled before the call was submitted
+                with self._lock_metrics:
+                    self.cnt_waiting -= 1
+
+    def get_depth(self) -> int:
+        """Return the number of calls that have not started yet."""
+        return self.cnt_waiting + self.cnt_queued
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return the queue depth and timing counters."""
+        with self._lock_metrics:
+            return {
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'depth': self.cnt_waiting + self.cnt_queued,
+                'waiting': self.cnt_waiting,
+                'queued': self.cnt_queued,
+                'running': self.cnt_running,
+                'done': self.cnt_done,
+                'max_depth': self.max_depth,
+                'avg_queued_ms': 1000 * self.seconds_queued / self.cnt_done if self.cnt_done else 0.0,
+                'avg_running_ms': 1000 * self.seconds_running / self.cnt_done if self.cnt_done else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -4,7 +4,7 @@ Hangman Game Implementation
 This module provides the classes and logic for a Hangman game. It includes classes for managing
 player actions, the game state, and automated/random players for testing or simulations.
 """
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import random
 from enum import Enum
 
@@ -50,6 +50,19 @@ class HangmanGameState:
         self.guesses = [guess.upper() for guess in guesses]
         self.phase = phase
 
+    def clone(self) -> "HangmanGameState":
+        """
+        Create a copy of the game state that does not share the list of guesses.
+
+        Returns:
+            HangmanGameState: The copied game state.
+        """
+        state = HangmanGameState.__new__(HangmanGameState)
+        state.word_to_guess = self.word_to_guess
+        state.guesses = list(self.guesses)
+        state.phase = self.phase
+        return state
+
     def incorrect_guesses(self) -> List[str]:
         """
         Get a list of incorrect guesses.
@@ -100,14 +113,17 @@ class Hangman:
     def __init__(self) -> None:
         """Initialize the Hangman game."""
         self.state: Optional[HangmanGameState] = None
+        self.undo_stack: List[Tuple[str, List[str], GamePhase]] = []
 
     def reset(self) -> None:
         """Reset the game state."""
         self.state = None
+        self.undo_stack = []
 
     def set_state(self, state: HangmanGameState) -> None:
         """Set the game state."""
         self.state = state
+        self.undo_stack = []
 
     def get_state(self) -> HangmanGameState:
         """Get the current game state."""
@@ -131,6 +147,7 @@ class Hangman:
             raise ValueError("Game state has not been set.")
 
         letter = guess_action.letter
+        self.undo_stack.append((self.state.word_to_guess, list(self.state.guesses), self.state.phase))
         if letter in self.state.guesses:
             print(f"Letter '{letter}' has already been guessed.")
             return  # Letter already guessed, no change
@@ -148,10 +165,31 @@ class Hangman:
         self.state.word_to_guess = self.state.word_to_guess.upper()
         self.state.guesses = [guess.upper() for guess in self.state.guesses]
 
+    def undo_action(self) -> None:
+        """Undo the last applied letter-guess action."""
+        if not self.state:
+            raise ValueError("Game state has not been set.")
+        if not self.undo_stack:
+            raise ValueError("There is no action to undo.")
+        word_to_guess, guesses, phase = self.undo_stack.pop()
+        self.state.word_to_guess = word_to_guess
+        self.state.guesses = guesses
+        self.state.phase = phase
+
 class RandomPlayer:
     """
     A player that makes random guesses in the Hangman game.
     """
+    def __init__(self, seed: Optional[int] = None, rng: Optional[random.Random] = None) -> None:
+        """
+        Initialize the player with its own random number generator.
+
+        Args:
+            seed (Optional[int]): Seed for reproducible guesses.
+            rng (Optional[random.Random]): Random number generator to use instead of a seeded one.
+        """
+        self.rng = rng if rng is not None else random.Random(seed)
+
     def make_guess(self, available_moves: List[GuessLetterAction]) -> GuessLetterAction:
         """
         Make a random guess from the available actions.
@@ -164,7 +202,7 @@ class RandomPlayer:
         """
         if not available_moves:
             raise ValueError("No available actions to guess.")
-        return random.choice(available_moves)
+        return self.rng.choice(available_moves)
 
 if __name__ == "__main__":
     game = Hangman()
@@ -1,14 +1,19 @@
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 import json
+import os
 import asyncio
+from typing import List, NamedTuple
 
 import server.py.hangman as hangman
 import server.py.battleship as battleship
 import server.py.dog as dog
+from server.py.serialization import StateStream, encode_batch, encode_message, send_payload
+from server.py.session import RoomError, SessionManager
+from server.py.executor import MAX_PENDING, MAX_WORKERS, EngineExecutor
 
 import random
 
@@ -18,6 +23,95 @@ app.mount("/inc/static", StaticFiles(directory="server/inc/static"), name="stati
 
 templates = Jinja2Templates(directory="server/inc/templates")
 
+# engine calls run in a thread pool, so a heavy turn does not block the other connections
+engine = EngineExecutor(max_workers=int(os.environ.get('ENGINE_WORKERS', MAX_WORKERS)),
+                        max_pending=int(os.environ.get('ENGINE_MAX_PENDING', MAX_PENDING)))
+
+
+def get_state_stream(websocket: WebSocket) -> StateStream:
+    """Use the delta protocol if the client connected with ?protocol=delta."""
+    return StateStream(delta=websocket.query_params.get('protocol') == 'delta')
+
+
+async def wait_for_client(websocket: WebSocket, stream: StateStream, seconds: float) -> None:
+    """Wait for seconds, handling resync requests of a delta client in the meantime."""
+    if not stream.delta:
+        await asyncio.sleep(seconds)
+        return
+    loop = asyncio.get_running_loop()
+    time_end = loop.time() + seconds
+    while (timeout := time_end - loop.time()) > 0:
+        try:
+            data = await asyncio.wait_for(websocket.receive_json(), timeout)
+        except asyncio.TimeoutError:
+            break
+        if data.get('type') == 'resync':
+            stream.request_resync()
+
+
+MAX_BATCH = 1000
+
+
+class BotPacing(NamedTuple):
+    """How fast the moves of bots are sent to a connection."""
+    delay: float  # seconds after each message, 0 in turbo mode
+    cnt_batch: int  # moves per message (batch mode if > 1)
+
+
+def get_bot_pacing(websocket: WebSocket, delay_default: float = 1.0) -> BotPacing:
+    """Read ?speed=<factor>|turbo and ?batch=<moves per message> of the connection."""
+    speed = websocket.query_params.get('speed', '1')
+    if speed == 'turbo':
+        delay = 0.0
+    else:
+        try:
+            delay = delay_default / float(speed) if float(speed) > 0 else delay_default
+        except ValueError:
+            delay = delay_default
+    try:
+        cnt_batch = min(max(int(websocket.query_params.get('batch', '1')), 1), MAX_BATCH)
+    except ValueError:
+        cnt_batch = 1
+    return BotPacing(delay=delay, cnt_batch=cnt_batch)
+
+
+class PacedSender:
+    """Sends the updates of bot moves, cnt_batch moves per message and delay seconds after each message."""
+
+    def __init__(self, websocket: WebSocket, pacing: BotPacing) -> None:
+        self.websocket = websocket
+        self.pacing = pacing
+        self.list_payload: List[bytes] = []
+
+    async def send(self, payload: bytes) -> None:
+        self.list_payload.append(payload)
+        if len(self.list_payload) >= self.pacing.cnt_batch:
+            await self.flush()
+            await asyncio.sleep(self.pacing.delay)  # also lets the other connections run in turbo mode
+
+    async def flush(self) -> None:
+        if len(self.list_payload) == 1:
+            await send_payload(self.websocket, self.list_payload[0])
+        elif self.list_payload:
+            await send_payload(self.websocket, encode_batch(self.list_payload))
+        self.list_payload = []
+
+
+async def read_client(websocket: WebSocket, stream: StateStream) -> None:
+    """Read the messages of a client that only watches bots, until it disconnects."""
+    try:
+        while True:
+            data = await websocket.receive_json()
+            if data.get('type') == 'resync':
+                stream.request_resync()
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/metrics/engine")
+async def engine_metrics():
+    return engine.get_metrics()
+
 
 @app.get("/", response_class=HTMLResponse)
 async def get(request: Request):
@@ -55,33 +149,26 @@ async def hangman_singleplayer_ws(websocket: WebSocket):
             game.print_state()
 
             state = game.get_player_view(idx_player_you)
-            list_action = game.get_list_action()
-            dict_state = state.model_dump()
-            dict_state['idx_player_you'] = idx_player_you
-            dict_state['list_action'] = [action.model_dump() for action in list_action]
-            data = {'type': 'update', 'state': dict_state}
-            await websocket.send_json(data)
+            list_action = await engine.run(game, game.get_list_action)
+            payload = encode_message('update', state, idx_player_you=idx_player_you, list_action=list_action)
+            await send_payload(websocket, payload)
 
             if state.phase == hangman.GamePhase.FINISHED:
                 break
 
             if len(list_action) == 0:
-                game.apply_action(None)
+                await engine.run(game, game.apply_action, None)
             else:
                 data = await websocket.receive_json()
                 if data['type'] == 'action':
                     action = hangman.GuessLetterAction.model_validate(data['action'])
-                    game.apply_action(action)
+                    await engine.run(game, game.apply_action, action)
                     print(action)
 
             continue
             state = game.get_player_view(idx_player_you)
-            dict_state = state.model_dump()
-            dict_state['idx_player_you'] = idx_player_you
-            dict_state['list_action'] = []
-
-            data = {'type': 'update', 'state': dict_state}
-            await websocket.send_json(data)
+            payload = encode_message('update', state, idx_player_you=idx_player_you, list_action=[])
+            await send_payload(websocket, payload)
 
     except WebSocketDisconnect:
         print('DISCONNECTED')
@@ -107,17 +194,14 @@ async def battleship_simulation_ws(websocket: WebSocket):
         while True:
 
             state = game.get_state()
-            list_action = game.get_list_action()
+            list_action = await engine.run(game, game.get_list_action)
             action = None
             if len(list_action) > 0:
                 action = player.select_action(state, list_action)
 
-            dict_state = state.model_dump()
-            dict_state['idx_player_you'] = idx_player_you
-            dict_state['list_action'] = []
-            dict_state['selected_action'] = None if action is None else action.model_dump()
-            data = {'type': 'update', 'state': dict_state}
-            await websocket.send_json(data)
+            payload = encode_message('update', state, idx_player_you=idx_player_you, list_action=[],
+                                     selected_action=action)
+            await send_payload(websocket, payload)
 
             if state.phase == battleship.GamePhase.FINISHED:
                 break
@@ -126,7 +210,7 @@ async def battleship_simulation_ws(websocket: WebSocket):
 
             if data['type'] == 'action':
                 action = battleship.BattleshipAction.model_validate(data['action'])
-                game.apply_action(action)
+                await engine.run(game, game.apply_action, action)
 
     except WebSocketDisconnect:
         print('DISCONNECTED')
@@ -137,6 +221,18 @@ async def battleship_singleplayer(request: Request):
     return templates.TemplateResponse("game/battleship/singleplayer.html", {"request": request})
 
 
+BATTLESHIP_BOTS = {
+    'easy': battleship.RandomPlayer,
+    'hard': battleship.HuntTargetPlayer,
+}
+
+
+def get_battleship_bot(websocket: WebSocket) -> battleship.PlayerState:
+    """Create the opponent selected with ?difficulty=easy|hard (default easy)."""
+    bot_class = BATTLESHIP_BOTS.get(websocket.query_params.get('difficulty', 'easy'), battleship.RandomPlayer)
+    return bot_class()
+
+
 @app.websocket("/battleship/singleplayer/ws")
 async def battleship_singleplayer_ws(websocket: WebSocket):
     await websocket.accept()
@@ -146,7 +242,9 @@ async def battleship_singleplayer_ws(websocket: WebSocket):
     try:
 
         game = battleship.Battleship()
-        player = battleship.RandomPlayer()
+        player = get_battleship_bot(websocket)
+        stream = get_state_stream(websocket)
+        pacing = get_bot_pacing(websocket)
 
         while True:
 
@@ -159,44 +257,36 @@ async def battleship_singleplayer_ws(websocket: WebSocket):
             if state.idx_player_active == idx_player_you:
 
                 state = game.get_player_view(idx_player_you)
-                list_action = game.get_list_action()
-                dict_state = state.model_dump()
-                dict_state['idx_player_you'] = idx_player_you
-                dict_state['list_action'] = [action.model_dump() for action in list_action]
-                data = {'type': 'update', 'state': dict_state}
-                await websocket.send_json(data)
+                list_action = await engine.run(game, game.get_list_action)
+                payload = stream.encode(state, idx_player_you=idx_player_you, list_action=list_action)
+                await send_payload(websocket, payload)
 
                 if len(list_action) == 0:
-                    game.apply_action(None)
+                    await engine.run(game, game.apply_action, None)
                 else:
                     data = await websocket.receive_json()
                     if data['type'] == 'action':
                         action = battleship.BattleshipAction.model_validate(data['action'])
-                        game.apply_action(action)
+                        await engine.run(game, game.apply_action, action)
                         print(action)
+                    elif data['type'] == 'resync':
+                        stream.request_resync()
 
                 state = game.get_player_view(idx_player_you)
-                dict_state = state.model_dump()
-                dict_state['idx_player_you'] = idx_player_you
-                dict_state['list_action'] = []
-
-                data = {'type': 'update', 'state': dict_state}
-                await websocket.send_json(data)
+                payload = stream.encode(state, idx_player_you=idx_player_you, list_action=[])
+                await send_payload(websocket, payload)
 
             else:
 
                 state = game.get_player_view(state.idx_player_active)
-                list_action = game.get_list_action()
+                list_action = await engine.run(game, game.get_list_action)
                 action = player.select_action(state, list_action)
                 if action is not None:
-                    await asyncio.sleep(1)
-                game.apply_action(action)
+                    await wait_for_client(websocket, stream, pacing.delay)
+                await engine.run(game, game.apply_action, action)
                 state = game.get_player_view(idx_player_you)
-                dict_state = state.model_dump()
-                dict_state['idx_player_you'] = idx_player_you
-                dict_state['list_action'] = []
-                data = {'type': 'update', 'state': dict_state}
-                await websocket.send_json(data)
+                payload = stream.encode(state, idx_player_you=idx_player_you, list_action=[])
+                await send_payload(websocket, payload)
 
     except WebSocketDisconnect:
         print('DISCONNECTED')
@@ -264,30 +354,33 @@ async def dog_simulation_ws(websocket: WebSocket):
     try:
         game = dog.Dog()
         random_player = dog.RandomPlayer()
-        game.reset() 
-
-        while True:
-            state = game.get_state()
-            list_action = game.get_list_action()
-
-            if state.phase == dog.GamePhase.FINISHED:
-                # notify the client that the game is over
-                await websocket.send_json({'type': 'finished', 'state': state.model_dump()})
-                break
-
-            # random player takes an action
-            action = random_player.select_action(state, list_action) if list_action else None
-
-            # send state update to the client
-            dict_state = state.model_dump()
-            dict_state['list_action'] = [action.model_dump() for action in list_action]
-            dict_state['selected_action'] = action.model_dump() if action else None
-            await websocket.send_json({'type': 'update', 'state': dict_state})
-
-            if action:
-                game.apply_action(action)
-
-            await asyncio.sleep(1)  # simulated delay for realism
+        game.reset()
+        stream = get_state_stream(websocket)
+        sender = PacedSender(websocket, get_bot_pacing(websocket))  # simulated delay for realism
+        reader = asyncio.create_task(read_client(websocket, stream))
+
+        try:
+            while not reader.done():
+                state = game.get_state()
+                list_action = await engine.run(game, game.get_list_action)
+
+                if state.phase == dog.GamePhase.FINISHED:
+                    # notify the client that the game is over
+                    await sender.flush()
+                    await send_payload(websocket, encode_message('finished', state))
+                    break
+
+                # random player takes an action
+                action = random_player.select_action(state, list_action) if list_action else None
+
+                # send state update to the client
+                payload = stream.encode(state, list_action=list_action, selected_action=action)
+                await sender.send(payload)
+
+                # also without an action: apply_action(None) passes the turn on
+                await engine.run(game, game.apply_action, action)
+        finally:
+            reader.cancel()
 
     except WebSocketDisconnect:
         print('DISCONNECTED')
@@ -306,7 +399,8 @@ async def dog_singleplayer_ws(websocket: WebSocket):
 
     try:
         game = dog.Dog()
-        game.reset() 
+        game.reset()
+        stream = get_state_stream(websocket)
 
         while True:
             state = game.get_player_view(idx_player_you)
@@ -319,17 +413,16 @@ async def dog_singleplayer_ws(websocket: WebSocket):
                 })
                 break
 
-            list_action = game.get_list_action()
+            list_action = await engine.run(game, game.get_list_action)
 
             # send the current state and available actions
-            dict_state = state.model_dump()
-            dict_state['idx_player_you'] = idx_player_you
-            dict_state['list_action'] = [action.model_dump() for action in list_action]
-            await websocket.send_json({'type': 'update', 'state': dict_state})
+            payload = stream.encode(state, idx_player_you=idx_player_you, list_action=list_action)
+            await send_payload(websocket, payload)
 
             if state.phase == dog.GamePhase.FINISHED:
                 # notify the client that the game has ended
-                await websocket.send_json({'type': 'finished', 'state': dict_state})
+                payload = encode_message('finished', state, idx_player_you=idx_player_you, list_action=list_action)
+                await send_payload(websocket, payload)
                 break
 
             if list_action:
@@ -337,12 +430,14 @@ async def dog_singleplayer_ws(websocket: WebSocket):
                     data = await websocket.receive_json()
                     if data['type'] == 'action':
                         action = dog.Action(**data['action'])
-                        game.apply_action(action)
+                        await engine.run(game, game.apply_action, action)
+                    elif data['type'] == 'resync':
+                        stream.request_resync()
                 except KeyError:
                     # handle unexpected message formats
                     await websocket.send_json({'type': 'error', 'message': 'Invalid action format'})
             else:
-                game.apply_action(None)
+                await engine.run(game, game.apply_action, None)
 
     except WebSocketDisconnect:
         print('DISCONNECTED')
@@ -355,29 +450,141 @@ async def dog_random_player_ws(websocket: WebSocket):
     try:
         game = dog.Dog()
         random_player = dog.RandomPlayer()
-        game.reset() 
+        game.reset()
+        stream = get_state_stream(websocket)
+        sender = PacedSender(websocket, get_bot_pacing(websocket))
+        reader = asyncio.create_task(read_client(websocket, stream))
 
-        while True:
-            state = game.get_state()
-            list_action = game.get_list_action()
+        try:
+            while not reader.done():
+                state = game.get_state()
+                list_action = await engine.run(game, game.get_list_action)
+
+                if state.phase == dog.GamePhase.FINISHED:
+                    await sender.flush()
+                    await send_payload(websocket, encode_message('finished', state))
+                    break
+
+                # random player takes an action
+                action = random_player.select_action(state, list_action) if list_action else None
+
+                # send state update to the client
+                payload = stream.encode(state, list_action=list_action, selected_action=action)
+                await sender.send(payload)
+
+                # also without an action: apply_action(None) passes the turn on
+                await engine.run(game, game.apply_action, action)
+        finally:
+            reader.cancel()
+
+    except WebSocketDisconnect:
+        print('DISCONNECTED')
+
+
+# ----- Dog rooms (multiplayer) -----
+
+dog_rooms = SessionManager(dog.Dog, cnt_seat=4, executor=engine)
 
-            if state.phase == dog.GamePhase.FINISHED:
-                await websocket.send_json({'type': 'finished', 'state': state.model_dump()})
-                break
 
-            # random player takes an action
-            action = random_player.select_action(state, list_action) if list_action else None
+def skip_turns_without_action(game: dog.Dog, max_turns: int = 100) -> None:
+    """Apply None for the players that have no action, as the singleplayer handler does."""
+    for _ in range(max_turns):
+        if game.get_state().phase == dog.GamePhase.FINISHED or game.get_list_action():
+            break
+        game.apply_action(None)
 
-            # send state update to the client
-            dict_state = state.model_dump()
-            dict_state['list_action'] = [action.model_dump() for action in list_action]
-            dict_state['selected_action'] = action.model_dump() if action else None
-            await websocket.send_json({'type': 'update', 'state': dict_state})
 
-            if action:
-                game.apply_action(action)
+@app.post("/dog/rooms")
+async def dog_room_create():
+    try:
+        room = dog_rooms.create_room()
+    except RoomError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    return room.get_info()
+
+
+@app.get("/dog/rooms/{room_id}")
+async def dog_room_info(room_id: str):
+    try:
+        room = dog_rooms.get_room(room_id)
+    except RoomError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    # get_state writes pending marble moves back into the state: not while a move is applied
+    async with room.lock:
+        return room.get_info()
+
+
+@app.get("/dog/room/")
+async def dog_room_new():
+    try:
+        room = dog_rooms.create_room()
+    except RoomError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    return RedirectResponse(f"/dog/room/{room.room_id}?seat=0", status_code=303)
+
+
+@app.get("/dog/room/{room_id}", response_class=HTMLResponse)
+async def dog_room(request: Request, room_id: str, seat: int = 0):
+    ws_endpoint = f"/dog/rooms/{room_id}/ws?seat={seat}&protocol=delta"
+    return templates.TemplateResponse("game/dog/multiplayer.html", {"request": request, "room_id": room_id,
+                                                                    "seat": seat, "ws_endpoint": ws_endpoint})
+
+
+@app.websocket("/dog/rooms/{room_id}/ws")
+async def dog_room_ws(websocket: WebSocket, room_id: str):
+    await websocket.accept()
+
+    try:
+        room = dog_rooms.get_room(room_id)
+        seat = websocket.query_params.get('seat')
+        idx_seat = room.get_free_seat() if seat is None else int(seat)
+        if idx_seat is None:
+            raise RoomError(f'Room {room_id} is full')
+        stream = get_state_stream(websocket)
+        seat_new, seat_old = room.join(idx_seat, websocket, stream, websocket.query_params.get('token'))
+    except (RoomError, ValueError) as e:
+        await websocket.send_json({'type': 'error', 'message': str(e)})
+        await websocket.close()
+        return
+
+    if seat_old is not None:
+        # reconnect with the token of the seat: the new connection takes over the seat
+        try:
+            await seat_old.websocket.close(code=4001)
+        except Exception:  # pylint: disable=broad-exception-caught
+            pass
+
+    try:
+        # the client needs the token to take its seat back after a reconnect
+        await websocket.send_json({'type': 'seat', 'idx_seat': idx_seat, 'token': seat_new.token})
+        async with room.lock:
+            await room.send_update(idx_seat)
+
+        while True:
+            data = await websocket.receive_json()
 
-            await asyncio.sleep(1)
+            if data['type'] == 'resync':
+                stream.request_resync()
+                async with room.lock:
+                    await room.send_update(idx_seat)
+
+            elif data['type'] == 'action':
+                async with room.lock:
+                    game = room.game
+                    list_action = await engine.run(game, game.get_list_action)
+                    action = None if data['action'] is None else dog.Action(**data['action'])
+                    if game.get_state().idx_player_active != idx_seat:
+                        await websocket.send_json({'type': 'error', 'message': 'It is not your turn'})
+                        continue
+                    if (action is None and list_action) or (action is not None and action not in list_action):
+                        await websocket.send_json({'type': 'error', 'message': 'Invalid action'})
+                        continue
+                    await engine.run(game, game.apply_action, action)
+                    await engine.run(game, skip_turns_without_action, game)
+                    room.touch()
+                    await room.broadcast()
 
     except WebSocketDisconnect:
         print('DISCONNECTED')
+    finally:
+        room.leave(idx_seat, websocket)
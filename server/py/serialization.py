@@ -0,0 +1,219 @@
+"""Wire serialization of game states and actions for the websocket handlers.
+
+The handlers used to build a dict with model_dump(), fill in the list of actions and
+let send_json() re-encode everything with the stdlib json module. Here the payload is
+produced directly as bytes:
+
+- pydantic models (Dog) are encoded by pydantic itself with model_dump_json(),
+- the encoding of an action is cached by its action code (see Action.get_code()),
+  so the same few hundred actions are encoded only once per process,
+- plain classes (Battleship, Hangman) are encoded from their public attributes,
+- orjson is used when it is installed, otherwise the stdlib json module.
+
+The output is byte-identical to what send_json() sent before.
+
+StateStream implements the delta protocol: the first message is a full snapshot
+{'type': 'snapshot', 'seq': n, 'state': {...}}, every following message a list of
+JSON-patch operations {'type': 'delta', 'seq': n, 'patch': [...]} relative to the
+previous message. A client that misses a sequence number (or fails to apply a
+patch) sends {'type': 'resync'} and gets a new snapshot.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+try:
+    import orjson  # pylint: disable=import-error
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+CACHE_ACTION_MAX_SIZE = 65536
+
+_cache_action: Dict[int, bytes] = {}
+
+
+def _default(obj: Any) -> Any:
+    """Convert the objects the JSON encoder does not know natively."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if hasattr(obj, '__dict__'):
+        return {name: value for name, value in vars(obj).items() if not name.startswith('_')}
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj as compact UTF-8 JSON (the same format as starlette's send_json)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)  # pylint: disable=no-member
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_model(obj: Any) -> bytes:
+    """Encode a state or action, using pydantic's own encoder for models."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump_json().encode('utf-8')
+    return dumps(obj)
+
+
+def encode_action(action: Any) -> bytes:
+    """Encode an action, cached by its action code if it has one."""
+    get_code = getattr(action, 'get_code', None)
+    if get_code is None:
+        return encode_model(action)
+    code = get_code()
+    if code < 0:
+        return encode_model(action)
+    data = _cache_action.get(code)
+    if data is None:
+        data = encode_model(action)
+        if len(_cache_action) < CACHE_ACTION_MAX_SIZE:
+            _cache_action[code] = data
+    return data
+
+
+def encode_list_action(list_action: List[Any]) -> bytes:
+    """Encode a list of actions as a JSON array."""
+    return b'[' + b','.join([encode_action(action) for action in list_action]) + b']'
+
+
+def encode_message(msg_type: str, state: Any, **extra: Any) -> bytes:
+    """Build a {'type': msg_type, 'state': {...}} message.
+
+    The keyword arguments are added to the state object in the given order, after
+    its own fields. 'list_action' is encoded as a list of actions, any other value
+    that is not a JSON scalar as a single action.
+    """
+    data_state = encode_model(state)
+    list_field = []
+    for name, value in extra.items():
+        if name == 'list_action':
+            data_value = encode_list_action(value)
+        elif value is None or isinstance(value, (bool, int, float, str)):
+            data_value = dumps(value)
+        else:
+            data_value = encode_action(value)
+        list_field.append(dumps(name) + b':' + data_value)
+    if list_field:
+        if data_state == b'{}':
+            data_state = b'{' + b','.join(list_field) + b'}'
+        else:
+            data_state = data_state[:-1] + b',' + b','.join(list_field) + b'}'
+    return b'{"type":' + dumps(msg_type) + b',"state":' + data_state + b'}'
+
+
+def encode_batch(list_payload: List[bytes]) -> bytes:
+    """Combine encoded messages into one {'type': 'batch', 'list_message': [...]} message."""
+    return b'{"type":"batch","list_message":[' + b','.join(list_payload) + b']}'
+
+
+async def send_payload(websocket: Any, payload: bytes) -> None:
+    """Send an encoded message as a text frame (the clients parse event.data as a string)."""
+    await websocket.send_text(payload.decode('utf-8'))
+
+
+def to_builtin(obj: Any) -> Any:
+    """Convert a state, action or value to dicts, lists and scalars (as encoded on the wire)."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, dict):
+        return {name: to_builtin(value) for name, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_builtin(value) for value in obj]
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if hasattr(obj, '__dict__'):
+        return {name: to_builtin(value) for name, value in vars(obj).items() if not name.startswith('_')}
+    return obj
+
+
+def _escape_pointer(key: Any) -> str:
+    """Escape a key for use in a JSON pointer (RFC 6901)."""
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _diff_list(old: List[Any], new: List[Any], path: str, patch: List[Dict[str, Any]]) -> None:
+    """Append the operations turning the list old into new to patch."""
+    cnt_old, cnt_new = len(old), len(new)
+    if cnt_new < cnt_old and old[cnt_old - cnt_new:] == new:
+        # elements taken from the front (e.g. dealing from the draw pile)
+        patch.extend({'op': 'remove', 'path': f'{path}/0'} for _ in range(cnt_old - cnt_new))
+        return
+    cnt_common = min(cnt_old, cnt_new)
+    for idx in range(cnt_common):
+        if old[idx] != new[idx]:
+            diff_state(old[idx], new[idx], f'{path}/{idx}', patch)
+    for idx in range(cnt_common, cnt_new):
+        patch.append({'op': 'add', 'path': f'{path}/-', 'value': new[idx]})
+    for idx in range(cnt_old - 1, cnt_common - 1, -1):
+        patch.append({'op': 'remove', 'path': f'{path}/{idx}'})
+
+
+def diff_state(old: Any, new: Any, path: str = '',
+               patch: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Return the JSON-patch operations (replace, add, remove) turning old into new.
+
+    Both values must be built from dicts, lists and scalars (see to_builtin()). Lists
+    that would need more operations than they have elements are replaced as a whole.
+    """
+    if patch is None:
+        patch = []
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            path_key = f'{path}/{_escape_pointer(key)}'
+            if key not in old:
+                patch.append({'op': 'add', 'path': path_key, 'value': value})
+            elif old[key] != value or type(old[key]) is not type(value):
+                diff_state(old[key], value, path_key, patch)
+        for key in old:
+            if key not in new:
+                patch.append({'op': 'remove', 'path': f'{path}/{_escape_pointer(key)}'})
+    elif isinstance(old, list) and isinstance(new, list):
+        patch_list: List[Dict[str, Any]] = []
+        _diff_list(old, new, path, patch_list)
+        if len(patch_list) > max(1, len(new)):
+            patch.append({'op': 'replace', 'path': path, 'value': new})
+        else:
+            patch.extend(patch_list)
+    else:
+        patch.append({'op': 'replace', 'path': path, 'value': new})
+    return patch
+
+
+class StateStream:
+    """Encodes the updates of one websocket connection, as full updates or as deltas.
+
+    With delta=False every message is a full 'update' (see encode_message()). With
+    delta=True the first message (and the first one after request_resync()) is a
+    'snapshot', all others are 'delta' messages with the patch to the previous state.
+
+    Delta mode trades server CPU for bandwidth: every message still converts the
+    whole state with to_builtin() and then compares it recursively with the previous
+    one (diff_state()), so encoding costs more than a full update while the messages
+    get much smaller.
+    """
+
+    def __init__(self, delta: bool = False) -> None:
+        self.delta = delta
+        self.seq = 0
+        self._dict_state_last: Optional[Dict[str, Any]] = None
+
+    def request_resync(self) -> None:
+        """Send a full snapshot with the next message."""
+        self._dict_state_last = None
+
+    def encode(self, state: Any, **extra: Any) -> bytes:
+        """Encode the next update of state with the extra fields (see encode_message())."""
+        if not self.delta:
+            return encode_message('update', state, **extra)
+        dict_state = to_builtin(state)
+        for name, value in extra.items():
+            dict_state[name] = to_builtin(value)
+        self.seq += 1
+        if self._dict_state_last is None:
+            payload = dumps({'type': 'snapshot', 'seq': self.seq, 'state': dict_state})
+        else:
+            patch = diff_state(self._dict_state_last, dict_state)
+            payload = dumps({'type': 'delta', 'seq': self.seq, 'patch': patch})
+        self._dict_state_last = dict_state
+        return payload
@@ -0,0 +1,186 @@
+"""In-process registry of game rooms for the websocket server.
+
+A room holds one game, the websockets connected to its seats and an asyncio lock
+that serializes the moves of the room. The game lives as long as the room, so a
+player can reconnect to a seat without setting up a new game. The registry is
+bounded: rooms without connections are evicted after idle_seconds, and when
+max_rooms is reached the least recently used empty room makes way for a new one.
+
+Joining a seat issues a reconnect token. An occupied seat can only be taken over by a
+connection presenting the token of that seat (the same client reconnecting).
+"""
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
+
+from server.py.executor import EngineExecutor
+from server.py.serialization import StateStream, encode_message, send_payload
+
+MAX_ROOMS = 1000
+IDLE_SECONDS = 30 * 60
+
+
+class RoomError(Exception):
+    """Raised when a room does not exist, is full or cannot be created."""
+
+
+class Seat:
+    """A websocket connected to a seat of a room, with its own update stream and reconnect token."""
+
+    def __init__(self, websocket: Any, stream: StateStream, token: str) -> None:
+        self.websocket = websocket
+        self.stream = stream
+        self.token = token
+
+
+class Room:
+    """A game shared by the websockets connected to its seats."""
+
+    def __init__(self, room_id: str, game: Any, cnt_seat: int, executor: Optional[EngineExecutor] = None) -> None:
+        self.room_id = room_id
+        self.game = game
+        self.cnt_seat = cnt_seat
+        self.executor = executor
+        self.dict_seat: Dict[int, Seat] = {}
+        self.lock = asyncio.Lock()
+        self.time_last_active = time.monotonic()
+
+    def touch(self) -> None:
+        """Mark the room as active now."""
+        self.time_last_active = time.monotonic()
+
+    def get_free_seat(self) -> Optional[int]:
+        """Return the first seat without a connection, or None if all are taken."""
+        for idx_seat in range(self.cnt_seat):
+            if idx_seat not in self.dict_seat:
+                return idx_seat
+        return None
+
+    def is_idle(self, now: float, idle_seconds: float) -> bool:
+        """Return True if nobody is connected and nothing happened for idle_seconds."""
+        return not self.dict_seat and now - self.time_last_active >= idle_seconds
+
+    def get_info(self) -> Dict[str, Any]:
+        """Return a summary of the room for the REST endpoints (call it holding the lock of the room)."""
+        state = self.game.get_state()
+        return {
+            'room_id': self.room_id,
+            'cnt_seat': self.cnt_seat,
+            'list_seat_taken': sorted(self.dict_seat),
+            'phase': getattr(state, 'phase', None),
+            'idx_player_active': getattr(state, 'idx_player_active', None),
+        }
+
+    def join(self, idx_seat: int, websocket: Any, stream: StateStream,
+             token: Optional[str] = None) -> Tuple[Seat, Optional[Seat]]:
+        """Connect websocket to idx_seat and return the new seat and the seat it replaced, if any.
+
+        A free seat gets a new reconnect token. An occupied seat is only taken over (a
+        reconnect) if token is the token of that seat.
+        """
+        if not 0 <= idx_seat < self.cnt_seat:
+            raise RoomError(f'Seat {idx_seat} does not exist in room {self.room_id}')
+        seat_old = self.dict_seat.get(idx_seat)
+        if seat_old is None:
+            token = secrets.token_urlsafe(16)
+        elif token is None or not secrets.compare_digest(token, seat_old.token):
+            raise RoomError(f'Seat {idx_seat} is taken in room {self.room_id}')
+        seat = Seat(websocket, stream, token)
+        self.dict_seat[idx_seat] = seat
+        self.touch()
+        return seat, seat_old
+
+    def leave(self, idx_seat: int, websocket: Any) -> None:
+        """Disconnect websocket from idx_seat (unless another connection took the seat over)."""
+        seat = self.dict_seat.get(idx_seat)
+        if seat is not None and seat.websocket is websocket:
+            del self.dict_seat[idx_seat]
+        self.touch()
+
+    async def get_list_action(self) -> List[Any]:
+        """Return the actions of the active player (in the executor, if the room has one)."""
+        if self.executor is None:
+            return cast(List[Any], self.game.get_list_action())
+        return cast(List[Any], await self.executor.run(self.game, self.game.get_list_action))
+
+    def encode_update(self, idx_seat: int, seat: Seat, list_action: List[Any]) -> bytes:
+        """Encode the view of idx_seat; only the active seat gets the list of actions."""
+        state = self.game.get_player_view(idx_seat)
+        if getattr(state, 'phase', None) == 'finished':
+            return encode_message('finished', state, idx_player_you=idx_seat, list_action=[])
+        if state.idx_player_active != idx_seat:
+            list_action = []
+        return seat.stream.encode(state, idx_player_you=idx_seat, list_action=list_action)
+
+    async def send_update(self, idx_seat: int) -> None:
+        """Send the current view to one seat."""
+        seat = self.dict_seat.get(idx_seat)
+        if seat is not None:
+            list_action = await self.get_list_action()
+            await send_payload(seat.websocket, self.encode_update(idx_seat, seat, list_action))
+
+    async def broadcast(self) -> None:
+        """Send the current view to every connected seat, dropping seats that fail."""
+        list_action = await self.get_list_action()
+        for idx_seat, seat in list(self.dict_seat.items()):
+            try:
+                await send_payload(seat.websocket, self.encode_update(idx_seat, seat, list_action))
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.leave(idx_seat, seat.websocket)
+
+
+class SessionManager:
+    """Registry of rooms (room id -> Room), bounded by max_rooms with idle eviction."""
+
+    def __init__(self, game_factory: Callable[[], Any], cnt_seat: int, max_rooms: int = MAX_ROOMS,
+                 idle_seconds: float = IDLE_SECONDS, executor: Optional[EngineExecutor] = None) -> None:
+        self.game_factory = game_factory
+        self.cnt_seat = cnt_seat
+        self.executor = executor
+        self.max_rooms = max_rooms
+        self.idle_seconds = idle_seconds
+        self._rooms: 'OrderedDict[str, Room]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def evict_idle(self) -> int:
+        """Remove the idle rooms and return how many were removed."""
+        now = time.monotonic()
+        list_room_id = [room_id for room_id, room in self._rooms.items() if room.is_idle(now, self.idle_seconds)]
+        for room_id in list_room_id:
+            del self._rooms[room_id]
+        return len(list_room_id)
+
+    def create_room(self) -> Room:
+        """Create a room with a new game, evicting idle or unused rooms to stay within max_rooms."""
+        self.evict_idle()
+        if len(self._rooms) >= self.max_rooms:
+            # least recently used room without connections
+            for room_id, room in self._rooms.items():
+                if not room.dict_seat:
+                    del self._rooms[room_id]
+                    break
+            else:
+                raise RoomError('Too many rooms, please try again later')
+        room_id = secrets.token_urlsafe(8)
+        while room_id in self._rooms:
+            room_id = secrets.token_urlsafe(8)
+        room = Room(room_id, self.game_factory(), self.cnt_seat, self.executor)
+        self._rooms[room_id] = room
+        return room
+
+    def get_room(self, room_id: str) -> Room:
+        """Return the room with room_id and mark it as recently used."""
+        room = self._rooms.get(room_id)
+        if room is None:
+            raise RoomError(f'Room {room_id} does not exist')
+        self._rooms.move_to_end(room_id)
+        room.touch()
+        return room
+
+    def list_rooms(self) -> List[Room]:
+        """Return all rooms, least recently used first."""
+        return list(self._rooms.values())
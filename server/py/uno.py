@@ -107,10 +107,14 @@ class Uno(Game):
 
 class RandomPlayer(Player):
 
+    def __init__(self, seed: Optional[int] = None, rng: Optional[random.Random] = None) -> None:
+        """ Initialize the player with its own random number generator (seeded for reproducible games) """
+        self.rng = rng if rng is not None else random.Random(seed)
+
     def select_action(self, state: GameState, actions: List[Action]) -> Optional[Action]:
         """ Given masked game state and possible actions, select the next action """
         if len(actions) > 0:
-            return random.choice(actions)
+            return self.rng.choice(actions)
         return None
 
 
@@ -1,9 +1,14 @@
 import pytest
 from typing import List
+import contextlib
+import io
 import sys
 import string
+import numpy as np
 from benchmark.benchmark import Benchmark
-from server.py.battleship import BattleshipGameState, PlayerState, Ship, BattleshipAction, ActionType, GamePhase
+from server.py.battleship import (Battleship, location_to_index, index_to_location, locations_to_mask, LOCATIONS,
+                                  PLACEMENTS, PlacementIndex, HuntTargetPlayer, RandomPlayer, BattleshipBatch,
+                                  BattleshipGameState, PlayerState, Ship, BattleshipAction, ActionType, GamePhase)
 
 
 class BattleshipBenchmark(Benchmark):
@@ -184,7 +189,8 @@ class BattleshipBenchmark(Benchmark):
         ]
         player0 = PlayerState(name='Player 1', ships=ships, shots=["A8"], successful_shots=[])
         player1 = PlayerState(name='Player 2', ships=ships, shots=[], successful_shots=[])
-        state = BattleshipGameState(idx_player_active=1, phase=GamePhase.RUNNING, winner=None, players=[player0, player1])
+        state = BattleshipGameState(idx_player_active=1, phase=GamePhase.RUNNING, winner=None,
+                                    players=[player0, player1])
         self.game_server.set_state(state)
         action = BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["A2"])
         self.game_server.apply_action(action)
@@ -210,6 +216,193 @@ class BattleshipBenchmark(Benchmark):
             assert len(set(player.shots)) == len(player.shots), "One target location has already been fired at once"
 
 
+VALID_LOCATIONS = [x_name + str(y_name) for x_name in list(string.ascii_uppercase)[:10] for y_name in range(1, 11)]
+
+@pytest.fixture
+def game_server() -> Battleship:
+    """Create a new seeded Battleship game for testing."""
+    return Battleship(seed=0)
+
+def test_undo_action(game_server: Battleship) -> None:
+    """Test 014: Undo restores the state before the last action [1 point]"""
+    ships = [Ship(name="destroyer", length=2, location=["A1", "A2"])]
+    player0 = PlayerState(name='Player 1', ships=[Ship(name="destroyer", length=2)], shots=[], successful_shots=[])
+    player1 = PlayerState(name='Player 2', ships=ships, shots=[], successful_shots=[])
+    state = BattleshipGameState(idx_player_active=0, phase=GamePhase.SETUP, winner=None, players=[player0, player1])
+    game = game_server
+    game.set_state(state)
+
+    game.apply_action(BattleshipAction(action_type=ActionType.SET_SHIP, ship_name='destroyer', location=["J9", "J10"]))
+    assert state.idx_player_active == 1 and player0.ships[0].location == ["J9", "J10"], "Set ship action not applied"
+    game.undo_action()
+    assert state.idx_player_active == 0, "Undo did not restore 'idx_player_active'"
+    assert player0.ships[0].location == [], "Undo did not restore the ship location"
+
+    state.phase = GamePhase.RUNNING
+    for location in ["A1", "C3", "A2"]:
+        game.apply_action(BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=[location]))
+        state.idx_player_active = 0
+    assert state.phase == GamePhase.FINISHED and state.winner == 0, "Game should be finished"
+    game.undo_action()
+    assert state.phase == GamePhase.RUNNING and state.winner is None, "Undo did not restore phase and winner"
+    assert player0.shots == ["A1", "C3"], "Undo did not remove the last shot"
+    assert player0.successful_shots == ["A1"], "Undo did not remove the last hit"
+    assert ships[0].hits == 1, "Undo did not restore the hits of the ship"
+
+def test_clone_state(game_server: Battleship) -> None:
+    """Test 015: Cloned state is equal but independent [1 point]"""
+    player = RandomPlayer(seed=0)
+    for _ in range(20):
+        action = player.select_action(game_server.get_state(), game_server.get_list_action())
+        if action is None:
+            break
+        game_server.apply_action(action)
+    state = game_server.get_state()
+    clone = state.clone()
+    assert clone.idx_player_active == state.idx_player_active and clone.phase == state.phase, "Clone differs"
+    for player, player_clone in zip(state.players, clone.players):
+        assert player_clone.shots == player.shots, "Clone has different shots"
+        assert player_clone.shots is not player.shots, "Clone shares the list of shots"
+        for ship, ship_clone in zip(player.ships, player_clone.ships):
+            assert (ship_clone.name, ship_clone.location, ship_clone.hits) == (ship.name, ship.location, ship.hits)
+
+def test_seeded_ship_placement() -> None:
+    """Test 016: Games with the same seed place ships identically [1 point]"""
+    placements = []
+    for _ in range(2):
+        game = Battleship(seed=3)
+        occupied: set = set()
+        ships = game.create_ships()
+        for ship in ships:
+            game.place_ship_randomly(ship, occupied)
+        placements.append([ship.location for ship in ships])
+    assert placements[0] == placements[1], "Error: Same seed produced different ship placements"
+
+def test_bitboards() -> None:
+    """Test 017: Bitboards follow the ship locations and shots [1 point]"""
+    locations = ["A1", "A10", "B1", "J10", "K1", "A11"]
+    assert [location_to_index(location) for location in locations] == [0, 9, 10, 99, None, None]
+    assert all(index_to_location(location_to_index(location)) == location for location in VALID_LOCATIONS)
+
+    ship = Ship(name="destroyer", length=2, location=["C3", "C4"])
+    player0 = PlayerState(name='Player 1', ships=[Ship(name="destroyer", length=2, location=["A1", "B1"])],
+                          shots=["J10"])
+    player1 = PlayerState(name='Player 2', ships=[ship], shots=[], successful_shots=[])
+    state = BattleshipGameState(idx_player_active=0, phase=GamePhase.RUNNING, winner=None, players=[player0, player1])
+    game = Battleship()
+    game.set_state(state)
+    assert ship.get_mask() == (1 << 22) | (1 << 23), "Error: Wrong bitboard of the ship"
+    assert len(game.get_list_action()) == 99, "Error: The shot at J10 must not be offered again"
+
+    player0.shots.append("A5")  # changed from outside
+    assert "A5" not in [action.location[0] for action in game.get_list_action()], "Error: Bitboard of shots is stale"
+    player0.shots[-1] = "A6"  # changed in place, same length
+    assert "A6" not in [action.location[0] for action in game.get_list_action()], "Error: Bitboard of shots is stale"
+    ship.location[1] = "C5"
+    assert ship.get_mask() == (1 << 22) | (1 << 24), "Error: Bitboard of the ship is stale"
+    ship.location[1] = "C4"
+    for location in ["C3", "C4"]:
+        game.apply_action(BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=[location]))
+        state.idx_player_active = 0
+    assert player0.get_mask_hits() == ship.get_mask() and ship.hits == 2, "Error: Hits not recorded"
+    assert state.phase == GamePhase.FINISHED and state.winner == 0, "Error: All ships sunk, game should be finished"
+
+def test_placement_tables() -> None:
+    """Test 018: Precomputed tables cover all locations and legal ship placements [1 point]"""
+    assert list(LOCATIONS) == sorted(VALID_LOCATIONS, key=lambda location: (location[0], int(location[1:])))
+    for length in range(2, 6):
+        placements = PLACEMENTS[length]
+        assert len(placements) == 2 * 10 * (10 - length + 1), f"Error: Wrong number of placements of length {length}"
+        assert len(set(placement.mask for placement in placements)) == len(placements), "Error: Duplicate placements"
+        for placement in placements:
+            x_coord = set(location[0] for location in placement.locations)
+            y_coord = set(location[1:] for location in placement.locations)
+            assert len(placement.locations) == length and (len(x_coord) == 1 or len(y_coord) == 1)
+            assert placement.mask == locations_to_mask(placement.locations)
+
+def test_placement_index() -> None:
+    """Test 019: Random placement draws once per ship from the free placements [1 point]"""
+    game = Battleship(seed=3)
+    ships = game.create_ships()
+    game.place_ships_randomly(ships)
+    mask_all = 0
+    for ship in ships:
+        mask = locations_to_mask(ship.location)
+        assert len(ship.location) == ship.length and mask & mask_all == 0, "Error: Ships overlap"
+        mask_all |= mask
+    # a single free place left: it must be found in one draw
+    index = PlacementIndex(((1 << 100) - 1) & ~locations_to_mask(['J7', 'J8', 'J9', 'J10']))
+    assert index.count(4) == 1 and index.count(5) == 0
+    assert index.sample(4, game.rng).locations == ('J7', 'J8', 'J9', 'J10')
+    assert index.sample(5, game.rng) is None
+
+def test_hunt_target_player() -> None:
+    """Test 020: The hunt/target player follows up on a hit and sets its ships [1 point]"""
+    game = Battleship(seed=5)
+    player = HuntTargetPlayer(seed=5)
+    state = game.get_player_view(0)
+    action = player.select_action(state, game.get_list_action())
+    assert action is not None and action.action_type == ActionType.SET_SHIP and len(action.location) > 0
+    heat = player.get_heat_map(0, 0, [5, 4, 3, 3, 2])
+    hint = "Error: Hunt does not start in the middle"
+    assert heat.argmax() in [location_to_index(location) for location in ['E5', 'E6', 'F5', 'F6']], hint
+    for ship in game.state.players[1].ships:
+        ship.location = []
+    game.state.players[1].ships[0].location = ['E3', 'E4', 'E5', 'E6', 'E7']
+    game.state.players[1].ships[1].location = ['A1', 'B1', 'C1', 'D1']
+    game.state.players[0].ships[0].location = ['A1']
+    game.state.phase = GamePhase.RUNNING
+    game.apply_action(BattleshipAction(ActionType.SHOOT, None, ['E5']))
+    game.state.idx_player_active = 0
+    action = player.select_action(game.get_player_view(0), game.get_list_action())
+    hint = "Error: Target does not shoot next to the hit"
+    assert action is not None and action.location[0] in ['D5', 'F5', 'E4', 'E6'], hint
+
+    # the view does not show sunk ships: a run of hits closed by a miss and the edge is taken as sunk
+    game.state.players[1].ships[4].location = ['J9', 'J10']
+    for location in ['J9', 'J10', 'J8']:
+        game.state.idx_player_active = 0
+        game.apply_action(BattleshipAction(ActionType.SHOOT, None, [location]))
+        view = game.get_player_view(0)
+        mask_sunk, lengths = player.infer_sunk(view.players[0].get_mask_shots(), view.players[0].get_mask_hits(),
+                                               [ship.length for ship in view.players[1].ships])
+        if location == 'J10':
+            assert mask_sunk == 0 and lengths == [5, 4, 3, 3, 2], "Error: The run of hits is still open at J8"
+    assert view.players[1].ships[4].location == [], "Error: The view must not show the sunk ship"
+    assert mask_sunk == locations_to_mask(['J9', 'J10']) and lengths == [5, 4, 3, 3], "Error: Sunk ship not inferred"
+    heat = player.get_heat_map(view.players[0].get_mask_shots(), view.players[0].get_mask_hits(), lengths, mask_sunk)
+    assert heat[location_to_index('I9')] == 0 and heat[location_to_index('I10')] == 0, "Error: Sunk ship still targeted"
+    game.state.idx_player_active = 0
+    action = player.select_action(game.get_player_view(0), game.get_list_action())
+    hint = "Error: Target must return to the hit afloat"
+    assert action is not None and action.location[0] in ['D5', 'F5', 'E4', 'E6'], hint
+
+def test_batch_matches_game() -> None:
+    """Test 021: The batch simulator plays like Battleship on the same seeds and shots [1 point]"""
+    seeds = list(range(8))
+    batch = BattleshipBatch.from_seeds(seeds)
+    games = []
+    for seed in seeds:
+        game = Battleship(seed=seed)
+        for player in game.state.players:
+            game.place_ships_randomly(player.ships)
+        game.state.phase = GamePhase.RUNNING
+        games.append(game)
+    rng = np.random.default_rng(0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        while not batch.is_finished().all():
+            cells = batch.get_random_action(rng)
+            for game, cell in zip(games, cells):
+                if game.state.phase != GamePhase.FINISHED:
+                    game.apply_action(BattleshipAction(ActionType.SHOOT, None, [LOCATIONS[cell]]))
+            batch.apply_action(cells)
+    assert all(game.state.phase == GamePhase.FINISHED for game in games), "Error: Batch finished before the games"
+    expected = BattleshipBatch.from_games(games)
+    assert np.array_equal(batch.ships, expected.ships) and np.array_equal(batch.shots, expected.shots)
+    assert np.array_equal(batch.winner, expected.winner), "Error: Batch and games have different winners"
+    assert np.array_equal(batch.idx_player_active, expected.idx_player_active)
+
+
 if __name__ == '__main__':
 
     benchmark = BattleshipBenchmark(sys.argv)
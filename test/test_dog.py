@@ -5,7 +5,7 @@ import os
 import json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from server.py.dog import Card, Marble, PlayerState, Action, GameState, GamePhase, Dog
+from server.py.dog import Card, Marble, PlayerState, Action, GameState, GamePhase, Dog, MOVE_TABLE, MoveTarget, get_card, RandomPlayer
 import pytest
 
 class TestDogBenchmark:
@@ -1939,6 +1939,366 @@ class TestDogBenchmark:
         hint += 'Error: Game should be finished.'
         assert state.phase == GamePhase.FINISHED, hint
 
+    def test_compact_marble_state_roundtrip(self):
+        """Test 055: Test compact marble representation stays in sync with the game state [1 point]"""
+
+        self.game_server.reset()
+        state = self.game_server.get_state()
+
+        idx_player_active = 0
+        state.idx_player_started = idx_player_active
+        state.idx_player_active = idx_player_active
+        state.bool_card_exchanged = True
+
+        player = state.list_player[idx_player_active]
+        player.list_card = [Card(suit='♣', rank='5')]
+        player.list_marble[0].pos = 10
+        player.list_marble[0].is_save = False
+        player2 = state.list_player[1]
+        player2.list_marble[0].pos = 15
+        player2.list_marble[0].is_save = False
+
+        self.game_server.set_state(state)
+        str_states = str(state)
+
+        action = Action(card=Card(suit='♣', rank='5'), pos_from=10, pos_to=15)
+        self.game_server.apply_action(action)
+        str_states += f'Action: {action}\n'
+
+        state = self.game_server.get_state()
+        str_states += str(state)
+
+        hint = str_states
+        hint += 'Error: Player 1\'s marble must be at pos=15 and player 2\'s marble back in kennel'
+        assert state.list_player[0].list_marble[0].pos == 15, hint
+        assert state.list_player[1].list_marble[0].pos >= self.CNT_STEPS, hint
+
+        view = self.game_server.get_player_view(idx_player_active)
+        hint = str_states
+        hint += 'Error: "get_player_view" must reflect the applied move'
+        assert view.list_player[0].list_marble[0].pos == 15, hint
+
+    def test_occupancy_index_after_swap(self):
+        """Test 056: Test position index is updated by JAKE swaps [1 point]"""
+
+        self.game_server.reset()
+        state = self.game_server.get_state()
+
+        idx_player_active = 0
+        state.idx_player_started = idx_player_active
+        state.idx_player_active = idx_player_active
+        state.bool_card_exchanged = True
+
+        player = state.list_player[idx_player_active]
+        player.list_card = [Card(suit='♣', rank='J')]
+        player.list_marble[0].pos = 5
+        player2 = state.list_player[1]
+        player2.list_marble[2].pos = 20
+
+        self.game_server.set_state(state)
+        str_states = str(state)
+
+        hint = str_states
+        hint += 'Error: "get_marble_at" must return (idx_player, idx_marble) of the occupying marble'
+        assert self.game_server.get_marble_at(5) == (0, 0), hint
+        assert self.game_server.get_marble_at(20) == (1, 2), hint
+        assert self.game_server.get_marble_at(30) is None, hint
+
+        action = Action(card=Card(suit='♣', rank='J'), pos_from=5, pos_to=20)
+        self.game_server.apply_action(action)
+        str_states += f'Action: {action}\n'
+
+        hint = str_states
+        hint += 'Error: Position index must follow the swapped marbles'
+        assert self.game_server.get_marble_at(5) == (1, 2), hint
+        assert self.game_server.get_marble_at(20) == (0, 0), hint
+        assert self.game_server.get_player_who_occupies_pos(20) == 0, hint
+
+    def test_precomputed_move_table(self):
+        """Test 057: Test precomputed move table contains board and finish targets [1 point]"""
+
+        targets = MOVE_TABLE[('5', 0, 0)]
+        hint = f'Error: Move table for card FIVE from pos=0 is wrong: {targets}'
+        assert targets == [MoveTarget(step=5, pos_to=5, path=(1, 2, 3, 4, 5), is_finish=False)], hint
+
+        targets = MOVE_TABLE[('4', 10, 1)]
+        hint = f'Error: Move table for card FOUR must mark backward moves as blocked: {targets}'
+        assert MoveTarget(step=-4, pos_to=6, path=None, is_finish=False) in targets, hint
+
+        targets = MOVE_TABLE[('5', 60, 0)]
+        hint = f'Error: Move table for card FIVE from pos=60 must contain the finish move to pos=68: {targets}'
+        assert MoveTarget(step=5, pos_to=68, path=(), is_finish=True) in targets, hint
+
+    def test_fold_SEVEN_restores_state(self):
+        """Test 058: Test folding a started SEVEN reverts moves, kicks and the played card [1 point]"""
+
+        self.game_server.reset()
+        state = self.game_server.get_state()
+
+        idx_player_active = 0
+        state.idx_player_started = idx_player_active
+        state.idx_player_active = idx_player_active
+        state.bool_card_exchanged = True
+
+        card = Card(suit='♣', rank='7')
+        player = state.list_player[idx_player_active]
+        player.list_card = [Card(suit='♣', rank='3'), card]
+        player.list_marble[0].pos = 10
+        player.list_marble[0].is_save = False
+        player2 = state.list_player[1]
+        player2.list_marble[0].pos = 12
+        player2.list_marble[0].is_save = False
+
+        self.game_server.set_state(state)
+        str_states = str(state)
+
+        action = Action(card=card, pos_from=10, pos_to=13)
+        self.game_server.apply_action(action)
+        str_states += f'Action: {action}\n'
+
+        state = self.game_server.get_state()
+        str_states += str(state)
+        hint = str_states
+        hint += 'Error: A started SEVEN must keep the state before the SEVEN in "seven_backup_state"'
+        assert state.seven_backup_state is not None, hint
+        assert state.seven_backup_state.list_player[0].list_marble[0].pos == 10, hint
+        assert state.seven_backup_state.seven_backup_state is None, hint
+        assert state.seven_steps_remaining == 4, hint
+
+        self.game_server.apply_action(None)
+        str_states += 'Action: None\n'
+
+        state = self.game_server.get_state()
+        str_states += str(state)
+        hint = str_states
+        hint += 'Error: Folding a SEVEN must restore marbles and cards of the active player'
+        assert state.list_player[0].list_marble[0].pos == 10, hint
+        assert state.list_player[1].list_marble[0].pos == 12, hint
+        assert state.list_player[0].list_card == [Card(suit='♣', rank='3'), card], hint
+        assert state.card_active is None, hint
+        assert state.idx_player_active == 1, hint
+
+    def test_undo_action_restores_state(self):
+        """Test 059: Test apply_action followed by undo_action restores the identical state [1 point]"""
+
+        self.game_server.reset()
+        state = self.game_server.get_state()
+
+        idx_player_active = 0
+        state.idx_player_started = idx_player_active
+        state.idx_player_active = idx_player_active
+        state.bool_card_exchanged = True
+
+        player = state.list_player[idx_player_active]
+        player.list_card = [Card(suit='♣', rank='A'), Card(suit='♣', rank='7'), Card(suit='♣', rank='J'),
+                            Card(suit='♦', rank='5'), Card(suit='', rank='JKR')]
+        player.list_marble[0].pos = 10
+        player.list_marble[1].pos = 0
+        player.list_marble[1].is_save = True
+        player2 = state.list_player[1]
+        player2.list_marble[0].pos = 14
+
+        self.game_server.set_state(state)
+        str_state = str(state)
+        dump_before = state.model_dump()
+
+        list_action = self.game_server.get_list_action()
+        for action in list_action + [None]:
+            self.game_server.apply_action(action)
+            if action is not None and action.card.rank == '7':
+                self.game_server.apply_action(None)  # fold the started SEVEN
+                self.game_server.undo_action()
+            self.game_server.undo_action()
+
+            hint = str_state
+            hint += f'Error: "undo_action" did not restore the state after {action}'
+            assert self.game_server.get_state().model_dump() == dump_before, hint
+
+        with pytest.raises(ValueError):
+            self.game_server.undo_action()
+
+    def test_clone_game_state(self):
+        """Test 060: Test cloned game state is equal but independent [1 point]"""
+
+        self.game_server.reset()
+        state = self.game_server.get_state()
+        clone = state.clone()
+
+        hint = 'Error: "clone" must return an equal game state'
+        assert clone == state, hint
+        assert clone.model_dump() == state.model_dump(), hint
+
+        hint = 'Error: "clone" must copy lists and marbles but share the cards'
+        assert clone.list_card_draw is not state.list_card_draw, hint
+        assert clone.list_card_draw[0] is state.list_card_draw[0], hint
+        clone.list_player[0].list_card.pop()
+        clone.list_player[0].list_marble[0].pos = 0
+        assert len(state.list_player[0].list_card) == 6, hint
+        assert state.list_player[0].list_marble[0].pos != 0, hint
+
+    def test_interned_cards(self):
+        """Test 061: Test dealt cards are interned, immutable and equal to constructed cards [1 point]"""
+
+        self.game_server.reset()
+        state = self.game_server.get_state()
+
+        hint = 'Error: Dealt cards must be the interned card instances'
+        for card in state.list_card_draw + state.list_player[0].list_card:
+            assert card is get_card(card.suit, card.rank), hint
+
+        card = Card(suit='♥', rank='A')
+        hint = 'Error: Constructed cards must be equal to (and hash like) the interned instance'
+        assert card == get_card('♥', 'A') and hash(card) == hash(get_card('♥', 'A')), hint
+        assert card.card_id == get_card('♥', 'A').card_id >= 0, hint
+        assert card != get_card('♦', 'A'), hint
+
+        with pytest.raises(Exception):
+            get_card('♥', 'A').rank = 'K'
+
+    def test_action_code(self):
+        """Test 062: Test actions are encoded as unique ints and list_action holds no duplicates [1 point]"""
+
+        action = Action(card=Card(suit='♥', rank='A'), pos_from=64, pos_to=0)
+        same = Action(card=get_card('♥', 'A'), pos_from=64, pos_to=0)
+        hint = 'Error: Equal actions must have the same code and hash'
+        assert action.get_code() == same.get_code() >= 0, hint
+        assert action == same and hash(action) == hash(same), hint
+
+        hint = 'Error: Different actions must have different codes'
+        others = [
+            Action(card=get_card('♥', 'A'), pos_from=64, pos_to=None),
+            Action(card=get_card('♥', 'A'), pos_from=None, pos_to=0),
+            Action(card=get_card('♦', 'A'), pos_from=64, pos_to=0),
+            Action(card=get_card('', 'JKR'), pos_from=None, pos_to=None, card_swap=get_card('♥', 'A')),
+            Action(card=get_card('', 'JKR'), pos_from=None, pos_to=None, card_swap=get_card('♦', 'A')),
+        ]
+        codes = {other.get_code() for other in others}
+        assert len(codes) == len(others) and action.get_code() not in codes, hint
+        assert action not in others, hint
+
+        unknown = Action(card=Card(suit='?', rank='?'), pos_from=1, pos_to=2)
+        hint = 'Error: Actions with unknown cards must fall back to comparing fields'
+        assert unknown.get_code() == -1, hint
+        assert unknown == Action(card=Card(suit='?', rank='?'), pos_from=1, pos_to=2), hint
+        assert unknown != Action(card=Card(suit='?', rank='?'), pos_from=1, pos_to=3), hint
+
+        self.game_server.reset()
+        state = self.game_server.get_state()
+        state.bool_card_exchanged = False
+        state.list_player[state.idx_player_active].list_card = [
+            get_card('♥', 'A'), Card(suit='♥', rank='A'), get_card('♦', '5')]
+        self.game_server.set_state(state)
+        list_action_found = self.game_server.get_list_action()
+        hint = 'Error: Card exchange must offer each distinct card once'
+        assert len(list_action_found) == 2, hint
+
+    def test_iter_actions(self):
+        """Test 063: Test iter_actions, has_any_action and count_actions match get_list_action [1 point]"""
+
+        self.game_server.reset()
+        state = self.game_server.get_state()
+        state.bool_card_exchanged = True
+        state.list_player[state.idx_player_active].list_card = [
+            get_card('♥', 'A'), get_card('♦', '7'), get_card('♣', 'J'), get_card('', 'JKR')]
+        state.list_player[state.idx_player_active].list_marble[0].pos = 5
+        self.game_server.set_state(state)
+
+        list_action_found = self.game_server.get_list_action()
+        hint = 'Error: iter_actions must yield the actions of get_list_action in the same order'
+        assert list(self.game_server.iter_actions()) == list_action_found, hint
+        hint = 'Error: count_actions and has_any_action must match get_list_action'
+        assert self.game_server.count_actions() == len(list_action_found) > 0, hint
+        assert self.game_server.has_any_action(), hint
+
+        state.list_player[state.idx_player_active].list_card = []
+        self.game_server.set_state(state)
+        assert self.game_server.get_list_action() == [], hint
+        assert self.game_server.count_actions() == 0, hint
+        assert not self.game_server.has_any_action(), hint
+
+    def test_seeded_game(self):
+        """Test 065: Test games and players with the same seed play identical trajectories [1 point]"""
+
+        list_trajectory = []
+        for _ in range(2):
+            game = Dog(seed=11)
+            player = RandomPlayer(seed=12)
+            trajectory = [game.get_state().model_dump()]
+            for _ in range(30):
+                list_action = game.get_list_action()
+                game.apply_action(player.select_action(game.get_state(), list_action))
+                trajectory.append(game.get_state().model_dump())
+            list_trajectory.append(trajectory)
+
+        hint = 'Error: The same seeds must produce the same game'
+        assert list_trajectory[0] == list_trajectory[1], hint
+        hint = 'Error: Different seeds must shuffle the cards differently'
+        assert Dog(seed=1).get_state().list_card_draw != Dog(seed=2).get_state().list_card_draw, hint
+
+    def test_player_view_masked(self):
+        """Test 068: Test the player view hides the other hands and the draw pile [1 point]"""
+
+        self.game_server.reset()
+        state = self.game_server.get_state()
+        view = self.game_server.get_player_view(1)
+
+        hint = 'Error: The player must see the own cards'
+        assert view.list_player[1].list_card == state.list_player[1].list_card, hint
+        for idx_player in [0, 2, 3]:
+            hint = f'Error: The cards of player {idx_player} must be hidden and counted'
+            assert view.list_player[idx_player].list_card == [], hint
+            assert view.list_player[idx_player].cnt_card == len(state.list_player[idx_player].list_card), hint
+            hint = 'Error: The marbles of all players must be visible'
+            assert view.list_player[idx_player].list_marble == state.list_player[idx_player].list_marble, hint
+        hint = 'Error: The draw pile must be hidden and counted'
+        assert view.list_card_draw == [], hint
+        assert view.cnt_card_draw == len(state.list_card_draw), hint
+        assert view.seven_backup_state is None, hint
+
+        hint = 'Error: The player view must not change the game state'
+        assert self.game_server.get_state().list_player[0].list_card == state.list_player[0].list_card, hint
+
+    def test_SEVEN_fold_after_set_state(self):
+        """Test 072: Test folding a SEVEN restores the state also after the state was set again [1 point]"""
+
+        card = Card(suit='♠', rank='7')
+        for restore in ('set_state', 'new_game'):
+            self.game_server.reset()
+            state = self.game_server.get_state()
+            state.cnt_round = 0
+            state.idx_player_started = 0
+            state.idx_player_active = 0
+            state.bool_card_exchanged = True
+            player = state.list_player[0]
+            player.list_card = [card]
+            player.list_marble[0].pos = 10
+            player.list_marble[0].is_save = False
+            marble = state.list_player[1].list_marble[0]
+            marble.pos = 12
+            marble.is_save = False
+            self.game_server.set_state(state)
+
+            self.game_server.apply_action(Action(card=card, pos_from=10, pos_to=13))
+            state = self.game_server.get_state()
+            str_states = str(state)
+            hint = str_states + 'Error 1: the SEVEN step must send the marble on pos 12 home.'
+            assert state.list_player[1].list_marble[0].pos == 72, hint
+
+            game = self.game_server if restore == 'set_state' else Dog()
+            game.set_state(state)
+            game.apply_action(None)
+            state = game.get_state()
+            str_states += f'Action: None ({restore})\n' + str(state)
+
+            hint = str_states + f'Error 2: the marbles must be restored after {restore}.'
+            assert state.list_player[0].list_marble[0].pos == 10, hint
+            assert state.list_player[1].list_marble[0].pos == 12, hint
+            hint = str_states + f'Error 3: the SEVEN must be back in the hand after {restore}.'
+            assert state.list_player[0].list_card == [card], hint
+            hint = str_states + 'Error 4: the SEVEN sequence must be closed.'
+            assert state.card_active is None and state.seven_backup_state is None, hint
+            assert state.idx_player_active == 1, hint
+
         # helper functions our code needs to run
     def get_idx_marble(self, player: PlayerState, pos: int) -> int:
         for idx_marble, marble in enumerate(player.list_marble):
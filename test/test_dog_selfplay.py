@@ -0,0 +1,53 @@
+# to run the test: pytest -v test/test_dog_selfplay.py
+
+import random
+from server.py.dog_selfplay import run_self_play, summarize, play_game, OUTCOME_ERROR
+from server.py.game import Player
+
+def test_self_play_runner():
+    """Test 064: Test headless self-play is deterministic per seed and independent of the pool size [1 point]"""
+
+    list_result = run_self_play(4, seed=7, processes=1, max_moves=50)
+    hint = 'Error: self-play must return one result per game in seed order'
+    assert [result.seed for result in list_result] == [7, 8, 9, 10], hint
+    assert all(result.cnt_moves <= 50 for result in list_result), hint
+
+    list_result_pool = run_self_play(4, seed=7, processes=2, max_moves=50)
+    hint = 'Error: self-play results must not depend on the number of processes'
+    assert [result._replace(seconds=0.0) for result in list_result] == \
+        [result._replace(seconds=0.0) for result in list_result_pool], hint
+
+    stats = summarize(list_result, seconds=1.0)
+    hint = 'Error: self-play statistics must add up'
+    assert stats.cnt_games == 4 and sum(stats.outcomes.values()) == 4, hint
+    assert stats.cnt_moves == sum(result.cnt_moves for result in list_result), hint
+
+def test_self_play_seedless_player():
+    """Test 071: Test self-play with players that take no seed keyword [1 point]"""
+
+    class RngPlayer(Player):
+        def __init__(self, rng=None):
+            self.rng = rng if rng is not None else random.Random()
+
+        def select_action(self, state, actions):
+            return self.rng.choice(actions) if actions else None
+
+    class SeedlessPlayer(Player):
+        def select_action(self, state, actions):
+            return actions[0] if actions else None
+
+    for player_factory in (RngPlayer, SeedlessPlayer):
+        list_trajectory = [run_self_play(2, seed=3, processes=1, player_factory=player_factory, max_moves=30)
+                           for _ in range(2)]
+        hint = f'Error: self-play must accept players without a seed keyword ({player_factory.__name__})'
+        assert all(result.outcome != OUTCOME_ERROR for result in list_trajectory[0]), hint
+        hint = f'Error: self-play with {player_factory.__name__} must be reproducible'
+        assert [result._replace(seconds=0.0) for result in list_trajectory[0]] == \
+            [result._replace(seconds=0.0) for result in list_trajectory[1]], hint
+
+    def broken_factory():
+        raise RuntimeError('no player')
+
+    result = play_game(5, broken_factory, max_moves=10)
+    hint = 'Error: a failing player factory must be reported as an error of the game'
+    assert result.outcome == OUTCOME_ERROR and 'no player' in result.error, hint
@@ -0,0 +1,37 @@
+# to run the test: pytest -v test/test_executor.py
+
+import asyncio
+import time
+from server.py.dog import Dog
+from server.py.executor import EngineExecutor
+
+def test_engine_executor():
+    """Test 070: Test engine calls in the executor run one at a time per game [1 point]"""
+
+    executor = EngineExecutor(max_workers=4, max_pending=2)
+    list_game = [Dog(seed=1), Dog(seed=2)]
+    list_event = []
+
+    def call(idx_game):
+        list_event.append(('start', idx_game))
+        time.sleep(0.01)
+        list_event.append(('end', idx_game))
+        return list_game[idx_game].get_list_action()
+
+    async def run_calls():
+        return await asyncio.gather(*[executor.run(list_game[idx % 2], call, idx % 2) for idx in range(8)])
+
+    list_result = asyncio.run(run_calls())
+    executor.shutdown()
+
+    hint = 'Error: The executor must return the results of the calls'
+    assert list_result[0] == Dog(seed=1).get_list_action(), hint
+    assert list_result[1] == Dog(seed=2).get_list_action(), hint
+    for idx_game in range(2):
+        list_event_game = [event for event, idx in list_event if idx == idx_game]
+        hint = 'Error: The calls for one game must not overlap'
+        assert list_event_game == ['start', 'end'] * 4, hint
+    metrics = executor.get_metrics()
+    hint = 'Error: The metrics must count the calls and end with an empty queue'
+    assert metrics['done'] == 8 and metrics['depth'] == 0 and metrics['running'] == 0, hint
+    assert 1 <= metrics['max_depth'] <= 8, hint
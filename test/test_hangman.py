@@ -106,3 +106,28 @@ def test_word_with_special_characters(game_server):
     game_server.set_state(state)
     game_server.apply_action(GuessLetterAction(letter='3'))
     assert game_server.get_state().phase == GamePhase.FINISHED, "Word with special characters not handled correctly"
+
+def test_undo_action(game_server):
+    """Test 011: Undo restores the state before the last guess [1 point]"""
+    state = HangmanGameState(word_to_guess="devops", guesses=['D'], phase=GamePhase.RUNNING)
+    game_server.set_state(state)
+    for letter in ['E', 'X', 'E']:
+        game_server.apply_action(GuessLetterAction(letter=letter))
+    assert game_server.get_state().guesses == ['D', 'E', 'X']
+
+    game_server.undo_action()
+    game_server.undo_action()
+    assert game_server.get_state().guesses == ['D', 'E'], "Undo did not remove the last guesses"
+    game_server.undo_action()
+    assert game_server.get_state().guesses == ['D'], "Undo did not restore the initial guesses"
+    assert game_server.get_state().phase == GamePhase.RUNNING, "Undo did not restore the phase"
+    with pytest.raises(ValueError):
+        game_server.undo_action()
+
+def test_clone_state():
+    """Test 012: Cloned state is equal but does not share the guesses [1 point]"""
+    state = HangmanGameState(word_to_guess="devops", guesses=['D'], phase=GamePhase.RUNNING)
+    clone = state.clone()
+    assert (clone.word_to_guess, clone.guesses, clone.phase) == (state.word_to_guess, state.guesses, state.phase)
+    clone.guesses.append('E')
+    assert state.guesses == ['D'], "Clone shares the list of guesses"
@@ -0,0 +1,75 @@
+# to run the test: pytest -v test/test_serialization.py
+
+import json
+from server.py.dog import Dog, RandomPlayer
+from server.py.serialization import StateStream, encode_message
+
+def test_serialization():
+    """Test 066: Test the websocket payload matches the JSON of model_dump() [1 point]"""
+
+    game = Dog(seed=5)
+    player = RandomPlayer(seed=6)
+    for _ in range(25):
+        state = game.get_state()
+        list_action = game.get_list_action()
+        action = player.select_action(state, list_action) if list_action else None
+
+        dict_state = state.model_dump()
+        dict_state['idx_player_you'] = 0
+        dict_state['list_action'] = [a.model_dump() for a in list_action]
+        dict_state['selected_action'] = action.model_dump() if action else None
+        expected = json.dumps({'type': 'update', 'state': dict_state}, ensure_ascii=False, separators=(',', ':'))
+
+        payload = encode_message('update', state, idx_player_you=0, list_action=list_action, selected_action=action)
+        hint = 'Error: The encoded payload must be the same JSON as the model_dump() of the state'
+        assert payload.decode('utf-8') == expected, hint
+        game.apply_action(action)
+
+def test_delta_stream():
+    """Test 067: Test applying the delta updates restores the full states [1 point]"""
+
+    def apply_patch(doc, patch):
+        for op in patch:
+            if op['path'] == '':
+                doc = op['value']
+                continue
+            *keys, key = op['path'][1:].split('/')
+            parent = doc
+            for k in keys:
+                parent = parent[int(k)] if isinstance(parent, list) else parent[k]
+            if isinstance(parent, list):
+                if op['op'] == 'add':
+                    parent.insert(len(parent) if key == '-' else int(key), op['value'])
+                elif op['op'] == 'remove':
+                    del parent[int(key)]
+                else:
+                    parent[int(key)] = op['value']
+            elif op['op'] == 'remove':
+                del parent[key]
+            else:
+                parent[key] = op['value']
+        return doc
+
+    game = Dog(seed=7)
+    player = RandomPlayer(seed=8)
+    stream = StateStream(delta=True)
+    dict_state = None
+    for idx_move in range(60):
+        state = game.get_state()
+        list_action = game.get_list_action()
+        action = player.select_action(state, list_action) if list_action else None
+        if idx_move == 30:
+            stream.request_resync()
+
+        data = json.loads(stream.encode(state, list_action=list_action, selected_action=action))
+        hint = 'Error: The sequence number must increase by one per message'
+        assert data['seq'] == idx_move + 1, hint
+        if data['type'] == 'snapshot':
+            dict_state = data['state']
+        else:
+            dict_state = apply_patch(dict_state, data['patch'])
+
+        expected = json.loads(encode_message('update', state, list_action=list_action, selected_action=action))
+        hint = 'Error: The patched state must be equal to the full state'
+        assert dict_state == expected['state'], hint
+        game.apply_action(action)
@@ -0,0 +1,67 @@
+# to run the test: pytest -v test/test_session.py
+
+import json
+import asyncio
+import pytest
+from server.py.dog import Dog
+from server.py.serialization import StateStream
+from server.py.session import RoomError, SessionManager
+
+def test_session_rooms():
+    """Test 069: Test rooms share a game between seats and are evicted when idle [1 point]"""
+
+    class FakeWebSocket:
+        def __init__(self):
+            self.list_sent = []
+
+        async def send_text(self, data):
+            self.list_sent.append(json.loads(data))
+
+    manager = SessionManager(Dog, cnt_seat=4, max_rooms=2, idle_seconds=60)
+    room = manager.create_room()
+    hint = 'Error: A created room must be found by its id'
+    assert manager.get_room(room.room_id) is room, hint
+
+    list_websocket = [FakeWebSocket() for _ in range(4)]
+    for idx_seat, websocket in enumerate(list_websocket):
+        assert room.get_free_seat() == idx_seat
+        room.join(idx_seat, websocket, StateStream())
+    hint = 'Error: A full room has no free seat'
+    assert room.get_free_seat() is None, hint
+
+    hint = 'Error: An occupied seat must only be taken over with its reconnect token'
+    with pytest.raises(RoomError):
+        room.join(0, FakeWebSocket(), StateStream())
+    with pytest.raises(RoomError):
+        room.join(0, FakeWebSocket(), StateStream(), token='guessed')
+    seat = room.dict_seat[0]
+    seat_new, seat_old = room.join(0, list_websocket[0], StateStream(), token=seat.token)
+    assert seat_old is seat and seat_new.token == seat.token, hint
+
+    asyncio.run(room.broadcast())
+    for idx_seat, websocket in enumerate(list_websocket):
+        state = websocket.list_sent[-1]['state']
+        hint = 'Error: Every seat must get its own player view'
+        assert state['idx_player_you'] == idx_seat, hint
+        assert len(state['list_player'][idx_seat]['list_card']) == 6, hint
+        assert state['list_player'][(idx_seat + 1) % 4]['list_card'] == [], hint
+        hint = 'Error: Only the active seat gets the list of actions'
+        assert (len(state['list_action']) > 0) == (idx_seat == state['idx_player_active']), hint
+
+    hint = 'Error: A room with connections must not be evicted'
+    room_other = manager.create_room()
+    with pytest.raises(RoomError):
+        manager.get_room('does-not-exist')
+    room_other.time_last_active -= 120
+    assert manager.evict_idle() == 1, hint
+    assert len(manager) == 1, hint
+
+    hint = 'Error: The registry must stay bounded by max_rooms'
+    manager.create_room()
+    manager.create_room()
+    assert len(manager) == 2, hint
+    for idx_seat, websocket in enumerate(list_websocket):
+        room.leave(idx_seat, websocket)
+    hint = 'Error: An empty room must be evicted after idle_seconds'
+    room.time_last_active -= 120
+    assert manager.evict_idle() == 1, hint